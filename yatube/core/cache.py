@@ -0,0 +1,325 @@
+"""Кэш-бэкенды, общие для всех воркеров.
+
+SQLiteCache хранит записи в отдельном файле SQLite, который видят все
+процессы на машине. TwoTierCache ставит перед любым общим кэшем
+небольшой LRU внутри процесса и считает попадания по каждому уровню.
+"""
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+_MISSING = object()
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite с WAL: годится как общий уровень без сервера.
+
+    Просроченные и лишние записи вычищаются не при каждом set(), а в
+    среднем раз в CULL_EVERY записей (OPTIONS, по умолчанию 100): чистка
+    считает строки всей таблицы.
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._cull_every = options.get('CULL_EVERY', 100)
+        self._path = location
+        self._local = threading.local()
+        self._created = False
+
+    @property
+    def _db(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self._path, timeout=5, isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            if not self._created:
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS cache ('
+                    'key TEXT PRIMARY KEY, value BLOB, expires REAL)'
+                )
+                connection.execute(
+                    'CREATE INDEX IF NOT EXISTS cache_expires '
+                    'ON cache (expires)'
+                )
+                self._created = True
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _write_lock(self):
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _select(self, key):
+        row = self._db.execute(
+            'SELECT value, expires FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return _MISSING
+        return pickle.loads(row[0])
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        value = self._select(key)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._db.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, self.pickle_protocol),
+             self.get_backend_timeout(timeout)),
+        )
+        self._maybe_cull()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._write_lock() as db:
+            if self._select(key) is not _MISSING:
+                return False
+            db.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                (key, pickle.dumps(value, self.pickle_protocol),
+                 self.get_backend_timeout(timeout)),
+            )
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._write_lock() as db:
+            value = self._select(key)
+            if value is _MISSING:
+                raise ValueError(f"Key '{key}' not found")
+            value += delta
+            db.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, self.pickle_protocol), key),
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._db.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def _maybe_cull(self):
+        if not self._cull_frequency:
+            return
+        # Случайно, а не по счётчику: пишут несколько процессов сразу.
+        if random.random() * self._cull_every >= 1:
+            return
+        db = self._db
+        db.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?',
+            (time.time(),),
+        )
+        count = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            db.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency,),
+            )
+
+    def close(self, **kwargs):
+        # Соединение живёт в потоке, закрывать его после каждого запроса
+        # незачем: открытие файла дороже самого запроса в кэш.
+        pass
+
+
+class _LocalTier:
+    """LRU внутри процесса, общий для всех потоков."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return _MISSING
+            value, expires = item
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return _MISSING
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_local_tiers = {}
+_metrics = {}
+_tiers_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """LRU процесса перед общим кэшем.
+
+    OPTIONS:
+        SHARED — алиас общего кэша из CACHES (обязателен);
+        LOCAL_MAX_ENTRIES — размер LRU, по умолчанию 1000;
+        LOCAL_TIMEOUT — сколько секунд запись живёт в LRU, по умолчанию 5.
+            Столько же другие воркеры могут видеть старое значение.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options['SHARED']
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        name = location or self._shared_alias
+        self._name = name
+        with _tiers_lock:
+            self._tier = _local_tiers.setdefault(
+                name, _LocalTier(options.get('LOCAL_MAX_ENTRIES', 1000))
+            )
+            self.metrics = _metrics.setdefault(name, {
+                'local_hits': 0, 'local_misses': 0,
+                'shared_hits': 0, 'shared_misses': 0,
+            })
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _count(self, name, amount=1):
+        with _tiers_lock:
+            self.metrics[name] += amount
+        if name in ('local_hits', 'shared_hits'):
+            metrics.record_cache(self._name, hits=amount)
+        elif name == 'shared_misses':
+            metrics.record_cache(self._name, misses=amount)
+
+    def _remember(self, key, value, timeout=DEFAULT_TIMEOUT):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        local_timeout = self._local_timeout
+        if timeout is not None:
+            local_timeout = min(local_timeout, timeout)
+        if local_timeout > 0:
+            self._tier.set(key, value, local_timeout)
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_key(key, version=version)
+        value = self._tier.get(local_key)
+        if value is not _MISSING:
+            self._count('local_hits')
+            return value
+        self._count('local_misses')
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._count('shared_misses')
+            return default
+        self._count('shared_hits')
+        self._remember(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found, rest = {}, []
+        for key in keys:
+            value = self._tier.get(self.make_key(key, version=version))
+            if value is _MISSING:
+                rest.append(key)
+            else:
+                found[key] = value
+        self._count('local_hits', len(found))
+        self._count('local_misses', len(rest))
+        if rest:
+            shared = self.shared.get_many(rest, version=version)
+            self._count('shared_hits', len(shared))
+            self._count('shared_misses', len(rest) - len(shared))
+            for key, value in shared.items():
+                self._remember(self.make_key(key, version=version), value)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._remember(self.make_key(key, version=version), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._remember(
+                self.make_key(key, version=version), value, timeout
+            )
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._remember(self.make_key(key, version=version), value)
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._tier.delete(self.make_key(key, version=version))
+        self.shared.delete(key, version=version)
+
+    def clear(self):
+        self._tier.clear()
+        self.shared.clear()
+
+
+def cache_metrics():
+    """Попадания и промахи по уровням всех TwoTierCache процесса."""
+    with _tiers_lock:
+        return {name: dict(values) for name, values in _metrics.items()}
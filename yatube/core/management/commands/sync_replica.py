@@ -0,0 +1,29 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует базу default в реплики SQLite из DATABASE_REPLICAS — '
+        'локальная замена репликации.'
+    )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('DATABASE_REPLICAS пуст (YATUBE_REPLICA=1).')
+        source = connections[DEFAULT_DB_ALIAS]
+        for alias in settings.DATABASE_REPLICAS:
+            target = connections[alias]
+            if {source.vendor, target.vendor} != {'sqlite'}:
+                raise CommandError('Копировать можно только SQLite в SQLite.')
+            target.close()
+            source.ensure_connection()
+            replica = sqlite3.connect(target.settings_dict['NAME'])
+            try:
+                source.connection.backup(replica)
+            finally:
+                replica.close()
+            self.stdout.write(self.style.SUCCESS(f'{alias}: скопирована.'))
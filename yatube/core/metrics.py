@@ -0,0 +1,231 @@
+"""Метрики производительности процесса.
+
+Гистограммы и счётчики копятся в памяти процесса и отдаются в текстовом
+формате Prometheus (core.views.metrics). Замеры одного запроса
+собираются в RequestMetrics, который PerformanceMiddleware кладёт в
+contextvar: так хуки в кэше, шаблонах и миниатюрах находят текущий
+запрос, ничего не зная о middleware.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+_lock = threading.Lock()
+_registry = []
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    inner = ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return '{' + inner + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        with _lock:
+            _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield f'{self.name}{_labels(self.labelnames, key)} {value}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}
+        with _lock:
+            _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with _lock:
+            state = self.values.setdefault(
+                key, [[0] * len(self.buckets), 0.0, 0]
+            )
+            counts = state[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        for key, (counts, total, count) in sorted(self.values.items()):
+            for bound, bucket in zip(self.buckets, counts):
+                labels = _labels(self.labelnames, key, [('le', bound)])
+                yield f'{self.name}_bucket{labels} {bucket}'
+            labels = _labels(self.labelnames, key, [('le', '+Inf')])
+            yield f'{self.name}_bucket{labels} {count}'
+            labels = _labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {total}'
+            yield f'{self.name}_count{labels} {count}'
+
+
+def render():
+    """Все метрики процесса в текстовом формате Prometheus 0.0.4."""
+    lines = []
+    with _lock:
+        for metric in _registry:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+REQUEST_SECONDS = Histogram(
+    'yatube_request_duration_seconds', 'Время ответа на запрос.',
+    ('view', 'method', 'status'),
+)
+DB_SECONDS = Histogram(
+    'yatube_request_db_seconds', 'Время запросов к базе за один запрос.',
+    ('view',),
+)
+DB_QUERIES = Histogram(
+    'yatube_request_db_queries', 'Число запросов к базе за один запрос.',
+    ('view',), buckets=QUERY_BUCKETS,
+)
+TEMPLATE_SECONDS = Histogram(
+    'yatube_request_template_seconds', 'Время рендера шаблонов.',
+    ('view',),
+)
+CACHE_REQUESTS = Counter(
+    'yatube_cache_requests_total', 'Обращения к кэшу по результату.',
+    ('cache', 'result'),
+)
+CACHE_RECOMPUTES = Counter(
+    'yatube_cache_recomputes_total',
+    'Пересчёты значений core.swr по причине.',
+    ('cache', 'reason'),
+)
+CACHE_COALESCED = Counter(
+    'yatube_cache_coalesced_total',
+    'Запросы, которые не пересчитывали значение, пока его считал другой.',
+    ('cache', 'result'),
+)
+THUMBNAIL_SECONDS = Histogram(
+    'yatube_thumbnail_seconds', 'Время подготовки миниатюр и копий.',
+    ('kind',),
+)
+
+
+class RequestMetrics:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.template_time = 0.0
+        self.thumbnail_time = 0.0
+        self.cache = {}
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        """Обёртка для connection.execute_wrapper."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+
+    def server_timing(self, total):
+        """Значение заголовка Server-Timing."""
+        entries = [
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};'
+            f'desc="{self.db_queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+        ]
+        if self.thumbnail_time:
+            entries.append(f'thumb;dur={self.thumbnail_time * 1000:.1f}')
+        for name, (hits, misses) in sorted(self.cache.items()):
+            entries.append(
+                f'cache-{name};desc="hit={hits} miss={misses}"'
+            )
+        return ', '.join(entries)
+
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def activate(request_metrics):
+    return _current.set(request_metrics)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+def current():
+    """RequestMetrics текущего запроса или None вне запроса."""
+    return _current.get()
+
+
+def record_cache(name, hits=0, misses=0):
+    if hits:
+        CACHE_REQUESTS.inc(hits, cache=name, result='hit')
+    if misses:
+        CACHE_REQUESTS.inc(misses, cache=name, result='miss')
+    request_metrics = current()
+    if request_metrics is not None:
+        old_hits, old_misses = request_metrics.cache.get(name, (0, 0))
+        request_metrics.cache[name] = (old_hits + hits, old_misses + misses)
+
+
+def record_template(seconds):
+    request_metrics = current()
+    if request_metrics is not None:
+        request_metrics.template_time += seconds
+
+
+@contextmanager
+def timed_thumbnail(kind):
+    """Замеряет подготовку картинки; в фоне — только в гистограмму."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        THUMBNAIL_SECONDS.observe(elapsed, kind=kind)
+        request_metrics = current()
+        if request_metrics is not None:
+            request_metrics.thumbnail_time += elapsed
+
+
+def observe_request(view, method, status, total, request_metrics):
+    REQUEST_SECONDS.observe(total, view=view, method=method, status=status)
+    DB_SECONDS.observe(request_metrics.db_time, view=view)
+    DB_QUERIES.observe(request_metrics.db_queries, view=view)
+    TEMPLATE_SECONDS.observe(request_metrics.template_time, view=view)
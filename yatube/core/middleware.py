@@ -0,0 +1,108 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics, routers
+from .querycheck import QueryCheckError, QueryTracker
+
+logger = logging.getLogger(__name__)
+
+
+class PerformanceMiddleware:
+    """Замеряет запрос целиком, базу, шаблоны, кэш и миниатюры.
+
+    Итог пишется в гистограммы core.metrics и, при SERVER_TIMING_HEADER,
+    в заголовок Server-Timing ответа. Ставится первым в MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.activate(request_metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(request_metrics.db_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.deactivate(token)
+        total = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else '<unresolved>'
+        metrics.observe_request(
+            view, request.method, response.status_code, total,
+            request_metrics,
+        )
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = request_metrics.server_timing(total)
+        return response
+
+
+class QueryCheckMiddleware:
+    """Ищет N+1 и медленные запросы, включается QUERYCHECK_MODE.
+
+    'log' пишет найденное в лог, 'raise' роняет запрос с N+1 исключением
+    QueryCheckError — так падают тесты, которые ходят по страницам.
+    """
+
+    def __init__(self, get_response):
+        if settings.QUERYCHECK_MODE not in ('log', 'raise'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryTracker(settings.QUERYCHECK_SLOW_MS) as tracker:
+            response = self.get_response(request)
+        threshold = settings.QUERYCHECK_REPEAT_THRESHOLD
+        repeated = tracker.repeated(threshold)
+        if not repeated and not tracker.slow:
+            return response
+        message = (
+            f'{request.method} {request.path}:\n'
+            f'{tracker.describe(threshold)}'
+        )
+        # Медленные запросы зависят от машины, поэтому роняем запрос
+        # только из-за повторов, а медленные лишь пишем в лог.
+        if repeated and settings.QUERYCHECK_MODE == 'raise':
+            raise QueryCheckError(message)
+        logger.warning(message)
+        return response
+
+
+class ReplicaMiddleware:
+    """Закрепляет клиента за default после записи (read-your-writes).
+
+    Если запрос что-то записал, ставится cookie REPLICA_PIN_COOKIE на
+    REPLICA_PIN_SECONDS — дольше, чем реплика может отставать. Без
+    DATABASE_REPLICAS не подключается.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = routers.activate(
+            pinned=settings.REPLICA_PIN_COOKIE in request.COOKIES
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            state = routers.deactivate(token)
+        if state.wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,139 @@
+"""Поиск N+1 и медленных запросов.
+
+QueryTracker перехватывает SQL через connection.execute_wrapper и
+группирует его по форме: текст запроса с плейсхолдерами, где списки
+IN (%s, %s, ...) свёрнуты в IN (...). Для каждой формы запоминается,
+из какой строки шаблона (или из какого места кода, если шаблона нет)
+она выполнялась, — так цикл {% for post in page_obj %}, начавший ходить
+в новую связь, виден сразу с номером строки.
+"""
+import os
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+import django
+from django.db import connections
+
+IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+SPACES_RE = re.compile(r'\s+')
+
+_paused = ContextVar('querycheck_paused', default=False)
+
+DJANGO_DIR = os.path.dirname(django.__file__)
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def normalize(sql):
+    """Форма запроса: без значений и с одинаковыми списками IN."""
+    return SPACES_RE.sub(' ', IN_LIST_RE.sub('IN (...)', sql)).strip()
+
+
+@contextmanager
+def paused():
+    """Не учитывать запросы фоновой работы, выполненной в потоке запроса.
+
+    Например, задач core.tasks при BACKGROUND_WORKERS = 0: их повторы —
+    не N+1 страницы.
+    """
+    token = _paused.set(True)
+    try:
+        yield
+    finally:
+        _paused.reset(token)
+
+
+def caller():
+    """Строка шаблона или кода проекта, из-за которой выполнен запрос."""
+    frame = sys._getframe(1)
+    code_origin = None
+    while frame is not None:
+        code = frame.f_code
+        if (
+            code.co_name == 'render_annotated'
+            and code.co_filename.startswith(DJANGO_DIR)
+        ):
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                name = origin.template_name or origin.name
+                return f'{name}:{token.lineno}'
+        if (
+            code_origin is None
+            and code.co_filename.startswith(PROJECT_DIR)
+            and not code.co_filename.startswith(os.path.dirname(__file__))
+        ):
+            code_origin = f'{code.co_filename}:{frame.f_lineno}'
+        frame = frame.f_back
+    return code_origin or '?'
+
+
+class QueryTracker:
+    """Контекстный менеджер, собирающий SQL по формам."""
+
+    def __init__(self, slow_ms=None):
+        self.slow_ms = slow_ms
+        self.counts = Counter()
+        self.durations = Counter()
+        self.origins = {}
+        self.slow = []
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def __call__(self, execute, sql, params, many, context):
+        if _paused.get():
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            shape = normalize(sql)
+            self.counts[shape] += 1
+            self.durations[shape] += elapsed
+            origin = self.origins.setdefault(shape, Counter())
+            origin[caller()] += 1
+            if self.slow_ms is not None and elapsed >= self.slow_ms:
+                self.slow.append((elapsed, sql))
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def repeated(self, threshold):
+        """Формы, выполненные не меньше threshold раз, частые первыми."""
+        return [
+            {
+                'sql': shape,
+                'count': count,
+                'ms': round(self.durations[shape], 2),
+                'origin': self.origins[shape].most_common(1)[0][0],
+            }
+            for shape, count in self.counts.most_common()
+            if count >= threshold
+        ]
+
+    def describe(self, threshold):
+        lines = [
+            f"{item['count']}× {item['origin']} ({item['ms']} мс): "
+            f"{item['sql']}"
+            for item in self.repeated(threshold)
+        ]
+        lines += [f'{ms:.1f} мс: {sql}' for ms, sql in self.slow]
+        return '\n'.join(lines)
+
+
+class QueryCheckError(AssertionError):
+    """Запрос одной формы повторился QUERYCHECK_REPEAT_THRESHOLD раз."""
@@ -0,0 +1,98 @@
+"""Чтение с реплик и «свои записи видны сразу».
+
+ReplicaRouter отправляет чтения на реплику только внутри представлений,
+помеченных @replica_reads, и только пока в этом запросе не было записи.
+Всё остальное — формы, админка, сессии, фоновые задачи — работает с
+default. ReplicaMiddleware замечает запись в запросе и ставит cookie на
+REPLICA_PIN_SECONDS: всё это время клиент читает из default и видит
+свой пост, комментарий или подписку, даже если реплика отстаёт.
+"""
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    """Маршрутизация одного запроса."""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.replica_reads = False
+        self.wrote = False
+        self.replica = None
+
+
+def activate(pinned=False):
+    return _state.set(RoutingState(pinned))
+
+
+def deactivate(token):
+    state = _state.get()
+    _state.reset(token)
+    return state
+
+
+def is_pinned():
+    """Клиент должен видеть свои записи: закреплён cookie или уже писал."""
+    state = _state.get()
+    return state is not None and (state.pinned or state.wrote)
+
+
+def replica_for_read():
+    """Реплика для чтения в текущем контексте или None — читать default."""
+    state = _state.get()
+    if (
+        state is None
+        or not state.replica_reads
+        or state.pinned
+        or state.wrote
+        or not settings.DATABASE_REPLICAS
+        or connections[DEFAULT_DB_ALIAS].in_atomic_block
+    ):
+        return None
+    if state.replica is None:
+        # Одна реплика на запрос: у разных реплик разное отставание.
+        state.replica = random.choice(settings.DATABASE_REPLICAS)
+    return state.replica
+
+
+def replica_reads(view):
+    """Разрешает представлению читать с реплики."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = _state.get()
+        if state is None:
+            return view(request, *args, **kwargs)
+        state.replica_reads = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            state.replica_reads = False
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return replica_for_read() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        # Явно: иначе Django запишет объект туда, откуда его прочитал.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        return {obj1._state.db, obj2._state.db} <= databases
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема приходит на реплики вместе с данными.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,43 @@
+"""SQLite с настройкой соединения из OPTIONS.
+
+Стандартный бэкенд передаёт OPTIONS прямо в sqlite3.connect(), а тут
+понимаются ещё три ключа:
+
+- pragmas — словарь PRAGMA, выполняемых на каждом новом соединении
+  (journal_mode=WAL, synchronous, mmap_size...);
+- init_command — SQL, выполняемый после них, как init_command у MySQL;
+- transaction_mode — DEFERRED (по умолчанию), IMMEDIATE или EXCLUSIVE.
+  IMMEDIATE берёт блокировку записи в начале atomic(): транзакция, которая
+  сначала читает, а потом пишет, ждёт busy timeout, а не падает сразу
+  с «database is locked» при попытке повысить блокировку.
+"""
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop('pragmas', {})
+        self.init_command = params.pop('init_command', None)
+        self.transaction_mode = params.pop(
+            'transaction_mode', 'DEFERRED'
+        ).upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ValueError(
+                f'transaction_mode: {self.transaction_mode} — нужно одно '
+                f'из {", ".join(TRANSACTION_MODES)}.'
+            )
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        if self.init_command:
+            conn.executescript(self.init_command)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
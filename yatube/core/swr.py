@@ -0,0 +1,119 @@
+"""Кэш с отдачей устаревшего значения на время пересчёта.
+
+Запись живёт в кэше дольше, чем считается свежей: fresh секунд она
+отдаётся как есть, ещё stale секунд — как устаревшая. Устаревшей
+считается и запись с другой версией (например, поколением из
+posts.feed_cache), поэтому ключ стабилен и смена версии не оставляет
+запросы без значения.
+
+Пересчитывает запись только тот, кто взял блокировку cache.add();
+остальные в это время отдают старую копию. Если копии нет совсем, они
+недолго ждут результата того, кто считает, и только потом считают сами.
+Такие запросы считаются в метрике yatube_cache_coalesced_total.
+
+Свежая запись может быть пересчитана раньше срока (XFetch): чем ближе
+конец свежести и чем дольше считалось значение, тем вероятнее, что
+запрос начнёт пересчёт сам, пока остальные ещё получают свежую копию.
+SWR_EARLY_BETA = 0 это отключает.
+"""
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+POLL_INTERVAL = 0.05
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def _expires_early(fresh_until, delta, now):
+    beta = settings.SWR_EARLY_BETA
+    if not beta or not delta:
+        return False
+    # 1 - random() лежит в (0, 1], логарифм от него определён.
+    return now - delta * beta * math.log(1 - random.random()) >= fresh_until
+
+
+def _recompute(key, compute, fresh, stale, version, name, reason):
+    metrics.record_cache(name, misses=1)
+    metrics.CACHE_RECOMPUTES.inc(cache=name, reason=reason)
+    started = time.time()
+    value = compute()
+    now = time.time()
+    cache.set(
+        key, (value, now + fresh, version, now - started), fresh + stale
+    )
+    return value
+
+
+def _served(name, result, value):
+    metrics.record_cache(name, hits=1)
+    if result:
+        metrics.CACHE_COALESCED.inc(cache=name, result=result)
+    return value
+
+
+def _stale_reason(entry, version, now):
+    """Почему запись надо пересчитать, или None, если она годится."""
+    if entry is None:
+        return 'miss'
+    _, fresh_until, entry_version, delta = entry
+    if entry_version != version:
+        return 'version'
+    if now >= fresh_until:
+        return 'expired'
+    if _expires_early(fresh_until, delta, now):
+        return 'early'
+    return None
+
+
+def _wait(key, version, name, deadline):
+    while time.time() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry[2] == version:
+            return _served(name, 'waited', entry[0])
+    metrics.CACHE_COALESCED.inc(cache=name, result='timeout')
+    return None
+
+
+def get_or_compute(key, compute, fresh, stale, version=None, force=False,
+                   name='swr'):
+    """Значение из кэша по key или compute(), не больше одного пересчёта.
+
+    force=True пересчитывает сразу — для клиента, который должен увидеть
+    свою запись. name — метка кэша в метриках. Если compute() вернул
+    None, дождавшиеся его запросы считают значение сами.
+    """
+    if force:
+        return _recompute(key, compute, fresh, stale, version, name, 'force')
+    entry = cache.get(key)
+    now = time.time()
+    reason = _stale_reason(entry, version, now)
+    if reason is None:
+        return _served(name, None, entry[0])
+    lock_key = _lock_key(key)
+    if cache.add(lock_key, 1, settings.SWR_LOCK_TIMEOUT):
+        try:
+            return _recompute(
+                key, compute, fresh, stale, version, name, reason
+            )
+        finally:
+            cache.delete(lock_key)
+    if entry is not None:
+        # Запись пересчитывает другой запрос. При досрочном пересчёте
+        # копия ещё свежая и в метрику устаревших не попадает.
+        return _served(
+            name, None if reason == 'early' else 'stale', entry[0]
+        )
+    value = _wait(key, version, name, now + settings.SWR_WAIT_TIMEOUT)
+    if value is not None:
+        return value
+    metrics.record_cache(name, misses=1)
+    return compute()
@@ -0,0 +1,56 @@
+"""Фоновые задачи в пуле потоков процесса, без внешнего брокера.
+
+Один пул размером BACKGROUND_WORKERS на все фоновые задачи: миниатюры,
+версии картинок, пересчёт счётчиков лент, раскладка ленты подписок,
+кандидаты в подписки. При BACKGROUND_WORKERS = 0 задача выполняется
+сразу в потоке, который её поставил.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from . import querycheck
+
+_executor = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_WORKERS,
+                thread_name_prefix='background',
+            )
+        return _executor
+
+
+def _in_worker(func, *args):
+    try:
+        func(*args)
+    finally:
+        connections.close_all()
+
+
+def submit(func, *args):
+    """Выполняет func(*args) в пуле сейчас же."""
+    if not settings.BACKGROUND_WORKERS:
+        with querycheck.paused():
+            func(*args)
+        return
+    _get_executor().submit(_in_worker, func, *args)
+
+
+def run_in_background(func, *args):
+    """Выполняет func(*args) в пуле после фиксации текущей транзакции.
+
+    Воркер не читает и не пишет базу раньше, чем запрос закончит с ней.
+    При BACKGROUND_WORKERS = 0 вызывает func сразу.
+    """
+    if not settings.BACKGROUND_WORKERS:
+        submit(func, *args)
+        return
+    transaction.on_commit(lambda: submit(func, *args))
@@ -1,4 +1,22 @@
-from django.test import TestCase, Client
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db.utils import ConnectionHandler
+from django.template import engines
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+
+from posts.models import Post
+
+from . import metrics, routers, swr, tasks
+from .cache import SQLiteCache, TwoTierCache
+from .querycheck import QueryCheckError, QueryTracker, normalize
 
 
 class ViewTestClass(TestCase):
@@ -12,3 +30,374 @@ class ViewTestClass(TestCase):
     def test_error_template(self):
         response = self.client.get('/nonexist-page/')
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = SQLiteCache(
+            os.path.join(self.directory, 'cache.sqlite3'), {}
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_get_set_add_incr(self):
+        """Базовые операции кэша работают поверх файла SQLite."""
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertTrue(self.cache.add('counter', 1, None))
+        self.assertEqual(self.cache.incr('counter'), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expired_entry_is_missing(self):
+        """Запись с истёкшим сроком не возвращается."""
+        self.cache.set('key', 'value', -1)
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_touch_ignores_expired_entry(self):
+        self.cache.set('key', 'value', -1)
+        self.assertFalse(self.cache.touch('key', 60))
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_culling_uses_expires_index(self):
+        """Чистка удаляет просроченные по индексу, а не сканом таблицы."""
+        cache = SQLiteCache(self.cache._path, {
+            'OPTIONS': {'MAX_ENTRIES': 2, 'CULL_EVERY': 1},
+        })
+        cache.set('old', 'value', -1)
+        for index in range(4):
+            cache.set(f'key{index}', index)
+        self.assertLessEqual(
+            cache._db.execute('SELECT COUNT(*) FROM cache').fetchone()[0], 3
+        )
+        plan = cache._db.execute(
+            'EXPLAIN QUERY PLAN DELETE FROM cache '
+            'WHERE expires IS NOT NULL AND expires <= 0'
+        ).fetchall()
+        self.assertIn('cache_expires', ' '.join(row[-1] for row in plan))
+
+    def test_entries_are_shared_between_instances(self):
+        """Второй экземпляр, как другой воркер, видит те же записи."""
+        other = SQLiteCache(self.cache._path, {})
+        self.cache.set('key', 'value')
+        self.assertEqual(other.get('key'), 'value')
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'two-tier-shared',
+    },
+})
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = TwoTierCache('two-tier-test', {
+            'OPTIONS': {'SHARED': 'shared', 'LOCAL_MAX_ENTRIES': 2},
+        })
+        self.cache.clear()
+        for name in self.cache.metrics:
+            self.cache.metrics[name] = 0
+
+    def test_hits_are_counted_per_tier(self):
+        """Повторное чтение обслуживается LRU процесса."""
+        caches['shared'].set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertEqual(self.cache.metrics, {
+            'local_hits': 1, 'local_misses': 2,
+            'shared_hits': 1, 'shared_misses': 1,
+        })
+
+    def test_local_tier_is_bounded(self):
+        """LRU вытесняет самые старые записи."""
+        for key in ('a', 'b', 'c'):
+            self.cache.set(key, key)
+        self.assertEqual(len(self.cache._tier.entries), 2)
+        self.assertEqual(self.cache.get('a'), 'a')
+        self.assertEqual(self.cache.metrics['shared_hits'], 1)
+
+    def test_writes_go_through_to_shared_tier(self):
+        """Запись и инкремент сразу видны в общем кэше."""
+        self.cache.set('counter', 1)
+        self.cache.incr('counter')
+        self.assertEqual(caches['shared'].get('counter'), 2)
+        self.cache.delete('counter')
+        self.assertIsNone(caches['shared'].get('counter'))
+
+
+class HistogramTests(SimpleTestCase):
+    def test_prometheus_text(self):
+        histogram = metrics.Histogram(
+            'test_latency_seconds', 'Тест.', ('view',), buckets=(0.1, 1)
+        )
+        self.addCleanup(metrics._registry.remove, histogram)
+        histogram.observe(0.05, view='a"b')
+        histogram.observe(0.5, view='a"b')
+        text = metrics.render()
+        self.assertIn('# TYPE test_latency_seconds histogram', text)
+        self.assertIn(
+            'test_latency_seconds_bucket{view="a\\"b",le="0.1"} 1', text
+        )
+        self.assertIn(
+            'test_latency_seconds_bucket{view="a\\"b",le="+Inf"} 2', text
+        )
+        self.assertIn('test_latency_seconds_count{view="a\\"b"} 2', text)
+
+
+@override_settings(SERVER_TIMING_HEADER=True)
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_server_timing_header(self):
+        """Заголовок содержит базу, шаблоны и попадания в кэш ленты."""
+        first = self.client.get('/')
+        timing = first['Server-Timing']
+        self.assertIn('total;dur=', timing)
+        self.assertIn('db;dur=', timing)
+        self.assertIn('tpl;dur=', timing)
+        self.assertIn('cache-feed;desc="hit=0 miss=1"', timing)
+        second = self.client.get('/')
+        self.assertIn(
+            'cache-feed;desc="hit=1 miss=0"', second['Server-Timing']
+        )
+
+    def test_metrics_endpoint(self):
+        self.client.get('/')
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(
+            response,
+            'yatube_request_duration_seconds_bucket{view="posts:index",'
+            'method="GET",status="200",le="0.005"}',
+        )
+        self.assertContains(response, 'yatube_request_db_queries_count')
+
+    def test_metrics_endpoint_is_private(self):
+        response = self.client.get('/metrics/', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 403)
+
+
+class QueryCheckTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('first', 'second', 'third'):
+            author = get_user_model().objects.create_user(username=name)
+            Post.objects.create(author=author, text='Пост')
+
+    def test_normalize_collapses_in_lists(self):
+        self.assertEqual(
+            normalize('SELECT 1  FROM t WHERE id IN (%s, %s, %s)'),
+            normalize('SELECT 1 FROM t WHERE id IN (%s)'),
+        )
+
+    def test_repeated_shape_points_to_template_line(self):
+        """N+1 в цикле шаблона находится вместе с номером строки."""
+        template = engines['django'].from_string(
+            '{% for post in posts %}\n'
+            '{{ post.author.username }}\n'
+            '{% endfor %}'
+        )
+        posts = list(Post.objects.all())
+        with QueryTracker() as tracker:
+            template.render({'posts': posts})
+        repeated = tracker.repeated(3)
+        self.assertEqual(len(repeated), 1)
+        self.assertEqual(repeated[0]['count'], 3)
+        self.assertTrue(repeated[0]['origin'].endswith(':2'))
+
+    @override_settings(QUERYCHECK_MODE='raise', QUERYCHECK_REPEAT_THRESHOLD=1)
+    def test_middleware_raises_in_raise_mode(self):
+        with self.assertRaises(QueryCheckError):
+            Client().get('/')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.view = routers.replica_reads(
+            lambda request: self.router.db_for_read(Post)
+        )
+
+    def route(self, pinned=False):
+        token = routers.activate(pinned)
+        try:
+            return self.view(None)
+        finally:
+            routers.deactivate(token)
+
+    def test_marked_views_read_from_replica(self):
+        self.assertEqual(self.route(), 'replica')
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_pinned_client_reads_default(self):
+        self.assertEqual(self.route(pinned=True), 'default')
+
+    def test_reads_after_write_go_to_default(self):
+        token = routers.activate()
+        try:
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+            self.assertEqual(self.view(None), 'default')
+        finally:
+            self.assertTrue(routers.deactivate(token).wrote)
+
+
+# Реплика указывает на ту же тестовую базу: проверяется только cookie.
+@override_settings(DATABASE_REPLICAS=['default'])
+class ReplicaMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='pinned')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_writes_pin_client_to_default(self):
+        """После поста, комментария или подписки ставится cookie."""
+        author = get_user_model().objects.create_user(username='author')
+        writes = [
+            ('/create/', {'text': 'Новый пост'}),
+            (f'/posts/{self.post.pk}/edit/', {'text': 'Правка'}),
+            (f'/posts/{self.post.pk}/comment/', {'text': 'Комментарий'}),
+            (f'/profile/{author.username}/follow/', None),
+            (f'/profile/{author.username}/unfollow/', None),
+        ]
+        for url, data in writes:
+            with self.subTest(url=url):
+                self.client.cookies.clear()
+                self.client.force_login(self.user)
+                if data is None:
+                    response = self.client.get(url)
+                else:
+                    response = self.client.post(url, data)
+                cookie = response.cookies.get(settings.REPLICA_PIN_COOKIE)
+                self.assertIsNotNone(cookie)
+                self.assertEqual(
+                    cookie['max-age'], settings.REPLICA_PIN_SECONDS
+                )
+
+    def test_reads_do_not_pin(self):
+        response = self.client.get('/')
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+
+class SQLiteBackendTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        settings_dict = {
+            **settings.SQLITE_PROFILES['production'],
+            'NAME': os.path.join(self.directory, 'db.sqlite3'),
+        }
+        handler = ConnectionHandler({'default': settings_dict})
+        self.connection = handler['default']
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.directory)
+
+    def test_pragmas_applied_on_connect(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_transactions_take_write_lock_immediately(self):
+        """BEGIN IMMEDIATE: вторая пишущая транзакция ждёт уже на входе."""
+        self.connection.ensure_connection()
+        self.connection._start_transaction_under_autocommit()
+        other = sqlite3.connect(
+            self.connection.settings_dict['NAME'], timeout=0
+        )
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                other.execute('BEGIN IMMEDIATE')
+        finally:
+            other.close()
+            self.connection.connection.rollback()
+
+
+class StaleWhileRevalidateTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+
+    def compute(self):
+        self.calls.append(1)
+        return len(self.calls)
+
+    def get(self, **kwargs):
+        return swr.get_or_compute('swr-test', self.compute, 60, 600,
+                                  **kwargs)
+
+    def test_fresh_value_is_not_recomputed(self):
+        self.assertEqual(self.get(version=1), 1)
+        self.assertEqual(self.get(version=1), 1)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_new_version_is_recomputed_once(self):
+        self.get(version=1)
+        self.assertEqual(self.get(version=2), 2)
+        self.assertEqual(self.get(version=2), 2)
+
+    def coalesced(self, result):
+        return metrics.CACHE_COALESCED.values.get(('swr', result), 0)
+
+    def test_stale_copy_served_while_locked(self):
+        """Пока пересчитывает другой воркер, отдаётся старая копия."""
+        self.get(version=1)
+        cache.add('swr-test:lock', 1)
+        before = self.coalesced('stale')
+        self.assertEqual(self.get(version=2), 1)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.coalesced('stale'), before + 1)
+        cache.delete('swr-test:lock')
+        self.assertEqual(self.get(version=2), 2)
+
+    @override_settings(SWR_WAIT_TIMEOUT=0)
+    def test_missing_value_computed_after_wait(self):
+        cache.add('swr-test:lock', 1)
+        self.assertEqual(self.get(), 1)
+
+    def test_force_recomputes(self):
+        self.get(version=1)
+        self.assertEqual(self.get(version=1, force=True), 2)
+        self.assertEqual(self.get(version=1), 2)
+
+    def test_early_expiration(self):
+        """Долгий пересчёт у конца свежести начинается досрочно."""
+        cache.set('swr-test', ('old', time.time() + 1, 1, 10.0), 600)
+        with mock.patch('core.swr.random.random', return_value=0.5):
+            self.assertEqual(self.get(version=1), 1)
+        with override_settings(SWR_EARLY_BETA=0):
+            cache.set('swr-test', ('old', time.time() + 1, 1, 10.0), 600)
+            self.assertEqual(self.get(version=1), 'old')
+
+
+class BackgroundTasksTests(TestCase):
+    def test_runs_inline_without_workers(self):
+        calls = []
+        with self.settings(BACKGROUND_WORKERS=0):
+            tasks.run_in_background(calls.append, 1)
+        self.assertEqual(calls, [1])
+
+    def test_waits_for_commit_with_workers(self):
+        """Задача уходит в пул только после фиксации транзакции."""
+        with mock.patch.object(tasks, 'submit') as submit:
+            with self.settings(BACKGROUND_WORKERS=2):
+                tasks.run_in_background(print, 1)
+            submit.assert_not_called()
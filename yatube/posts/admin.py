@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Post, Group, Comment
 
 
@@ -16,6 +17,18 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Ищем по полнотекстовому индексу вместо LIKE '%term%' по таблице.
+        matches = (
+            search.filter_matching(queryset, search_term)
+            if search_term else None
+        )
+        if matches is None:
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return matches, False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = (
@@ -0,0 +1,185 @@
+"""JSON-API лент только для чтения.
+
+Ленты берут те же querysets, что и HTML-страницы, и листаются курсором
+(?after=/?before=, как KeysetPaginator). ETag и Last-Modified считаются
+по поколениям лент из feed_cache: это чтения кэша плюс, для группы,
+профиля и поста, один запрос по первичному или уникальному ключу.
+Неизменившаяся страница отдаёт 304 ещё до выборки постов.
+
+API читает default, а не реплику: иначе страница с отставшей реплики
+закэшировалась бы у клиента под ETag уже нового поколения.
+"""
+import hashlib
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition, require_safe
+
+from . import feed_cache
+from .models import Group, Post, User
+from .paginator import KeysetPaginator
+from .timeline import follow_feed
+from .utils import get_comments_page
+
+PAGE_PARAMS = ('after', 'before')
+
+
+def _post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': post.author.username,
+        'group': post.group.slug if post.group else None,
+        'image': post.image.url if post.image else None,
+        'renditions': [
+            {
+                'url': rendition.image.url,
+                'format': rendition.format,
+                'width': rendition.width,
+            }
+            for rendition in post.renditions.all()
+        ],
+    }
+
+
+def _comment(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
+
+
+def _page(request, post_list):
+    paginator = KeysetPaginator(post_list, settings.POSTS_API_PAGE_SIZE)
+    page = paginator.get_page(
+        after=request.GET.get('after'), before=request.GET.get('before')
+    )
+    return JsonResponse({
+        'results': [_post(post) for post in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def _etag(names, request, *extra):
+    """ETag страницы: поколения лент, параметры курсора и extra."""
+    versions = [feed_cache.feed_key(name) for name in names]
+    versions += [request.GET.get(param, '') for param in PAGE_PARAMS]
+    versions += [str(value) for value in extra]
+    return hashlib.md5('|'.join(versions).encode()).hexdigest()
+
+
+def feed_condition(feed_names):
+    """condition() по поколениям лент, которые вернёт feed_names.
+
+    feed_names(request, **kwargs) возвращает список лент или None, если
+    страницы нет (тогда представление само ответит 404 или 401).
+    """
+    def names(request, **kwargs):
+        # ETag и Last-Modified считаются по одним и тем же лентам.
+        if not hasattr(request, '_feed_names'):
+            request._feed_names = feed_names(request, **kwargs)
+        return request._feed_names
+
+    def etag(request, **kwargs):
+        found = names(request, **kwargs)
+        return _etag(found, request) if found else None
+
+    def last_modified(request, **kwargs):
+        found = names(request, **kwargs)
+        return feed_cache.last_modified(found) if found else None
+
+    return condition(etag, last_modified)
+
+
+def _group_feed(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    return [f'group:{group_id}'] if group_id else None
+
+
+def _profile_feed(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    return [f'profile:{author_id}'] if author_id else None
+
+
+def _follow_feed(request):
+    if not request.user.is_authenticated:
+        return None
+    return feed_cache.follow_feed_names(request.user.pk)
+
+
+def _post_updated(request, post_id):
+    if not hasattr(request, '_post_updated'):
+        request._post_updated = Post.objects.filter(
+            pk=post_id
+        ).values_list('updated', flat=True).first()
+    return request._post_updated
+
+
+def post_etag(request, post_id):
+    updated = _post_updated(request, post_id)
+    if updated is None:
+        return None
+    return _etag(
+        [f'post:{post_id}'], request, updated.isoformat(),
+        request.GET.get('comments_after', ''),
+    )
+
+
+def post_last_modified(request, post_id):
+    updated = _post_updated(request, post_id)
+    modified = feed_cache.last_modified([f'post:{post_id}'])
+    if updated is None or modified is None:
+        return updated
+    return max(updated, modified)
+
+
+@require_safe
+@feed_condition(lambda request: ['index'])
+def index(request):
+    return _page(request, Post.objects.for_feed())
+
+
+@require_safe
+@feed_condition(_group_feed)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _page(request, group.posts.for_feed())
+
+
+@require_safe
+@feed_condition(_profile_feed)
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return _page(request, author.posts.for_feed())
+
+
+@require_safe
+@feed_condition(_follow_feed)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {'detail': 'Нужно войти в аккаунт.'}, status=401
+        )
+    return _page(request, follow_feed(request.user).for_feed())
+
+
+@require_safe
+@condition(post_etag, post_last_modified)
+def post_detail(request, post_id):
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
+    comments = get_comments_page(post, request.GET.get('comments_after'))
+    data = _post(post)
+    data['comments'] = {
+        'results': [_comment(comment) for comment in comments],
+        'next': comments.next_cursor,
+    }
+    return JsonResponse(data)
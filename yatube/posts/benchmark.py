@@ -0,0 +1,385 @@
+"""Замер всех именованных маршрутов posts, api и users.
+
+seed() наполняет базу через mixer и Faker: пользователи, группы, посты
+(часть с картинками), комментарии и граф подписок. Производные данные —
+счётчики, ленты подписок, поисковый индекс, копии картинок — строятся
+теми же функциями, что и management-команды rebuild_*. run() обходит
+маршруты тестовым клиентом и для каждого считает перцентили задержки,
+число запросов к базе и пик выделенной памяти. Команда benchmark
+запускает всё это на временной тестовой базе и пишет отчёт в JSON.
+
+concurrency() нагружает базу из нескольких потоков сразу — чтение лент
+под непрерывной публикацией постов — для сравнения профилей SQLite
+командой benchmark_sqlite.
+
+follow_graph() и recommendations() замеряют расчёт кандидатов в подписки
+на синтетическом графе в памяти (команда benchmark_recommendations):
+миллионы рёбер в базу ради замера алгоритма загружать незачем.
+"""
+import io
+import math
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.contrib.auth import SESSION_KEY, get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import (
+    OperationalError, connection, reset_queries, transaction,
+)
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from faker import Faker
+from mixer.backend.django import Mixer
+from PIL import Image
+
+from users import urls as users_urls
+
+from . import (
+    recommendations as follow_recommendations, renditions, search, stats,
+    thumbnails, timeline,
+)
+from . import api_urls, urls as posts_urls
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+DATASET = {
+    'users': 50,
+    'groups': 5,
+    'posts': 1000,
+    'images': 20,
+    'comments': 2000,
+    'follows': 10,
+}
+
+BATCH_SIZE = 500
+
+
+def _image_pool(size):
+    """Несколько картинок в хранилище, на которые ссылаются посты."""
+    names = []
+    for index in range(size):
+        buffer = io.BytesIO()
+        color = (index * 40 % 256, 120, 200)
+        Image.new('RGB', (1200, 800), color).save(buffer, 'JPEG')
+        names.append(default_storage.save(
+            f'posts/bench-{index}.jpg', ContentFile(buffer.getvalue())
+        ))
+    return names
+
+
+def seed(users, groups, posts, images, comments, follows, random_seed=0):
+    """Заполняет базу и возвращает параметры маршрутов для run().
+
+    Кэш очищается: ключи лент с прошлых прогонов ссылались бы на посты,
+    которых в новой базе нет.
+    """
+    cache.clear()
+    rng = random.Random(random_seed)
+    Faker.seed(random_seed)
+    faker = Faker('ru_RU')
+    maker = Mixer(commit=False)
+
+    User.objects.bulk_create(
+        [maker.blend(User) for _ in range(users)], batch_size=BATCH_SIZE
+    )
+    Group.objects.bulk_create(
+        [
+            maker.blend(Group, title=faker.catch_phrase()[:200])
+            for _ in range(groups)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    user_list = list(User.objects.order_by('pk'))
+    group_list = list(Group.objects.order_by('pk'))
+
+    Post.objects.bulk_create(
+        [
+            maker.blend(
+                Post,
+                author=rng.choice(user_list),
+                group=rng.choice(group_list + [None]),
+                text=faker.paragraph(nb_sentences=5),
+                image='',
+            )
+            for _ in range(posts)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    # bulk_create ставит всем постам «сейчас»; разносим даты назад, чтобы
+    # ленты и курсоры работали на правдоподобном распределении.
+    now = timezone.now()
+    with transaction.atomic():
+        for pk in post_ids:
+            minutes = rng.randint(0, 60 * 24 * 90)
+            Post.objects.filter(pk=pk).update(
+                pub_date=now - timedelta(minutes=minutes)
+            )
+        pool = _image_pool(min(images, 5))
+        for pk in rng.sample(post_ids, min(images, len(post_ids))):
+            Post.objects.filter(pk=pk).update(image=rng.choice(pool))
+
+    Comment.objects.bulk_create(
+        [
+            Comment(
+                post_id=rng.choice(post_ids),
+                author=rng.choice(user_list),
+                text=faker.sentence(),
+            )
+            for _ in range(comments)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    follow_list = []
+    for user in user_list:
+        others = [author for author in user_list if author != user]
+        for author in rng.sample(others, min(follows, len(others))):
+            follow_list.append(Follow(user=user, author=author))
+    Follow.objects.bulk_create(
+        follow_list, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+    stats.rebuild()
+    timeline.rebuild()
+    search.rebuild()
+    with override_settings(BACKGROUND_WORKERS=0):
+        for post in Post.objects.exclude(image=''):
+            renditions.generate(post)
+            thumbnails.pregenerate(post.image)
+
+    reader = User.objects.order_by('-stats__following_count', 'pk').first()
+    post = Post.objects.filter(image__gt='').first() or Post.objects.first()
+    return {
+        'user': reader,
+        'kwargs': {
+            'slug': group_list[0].slug if group_list else '',
+            'username': post.author.username,
+            'post_id': post.pk,
+            'uidb64': urlsafe_base64_encode(force_bytes(reader.pk)),
+            'token': default_token_generator.make_token(reader),
+        },
+    }
+
+
+def routes(kwargs):
+    """(имя, url) для каждого именованного маршрута posts, api и users."""
+    found = []
+    for module in (posts_urls, api_urls, users_urls):
+        for pattern in module.urlpatterns:
+            name = f'{module.app_name}:{pattern.name}'
+            params = {
+                key: kwargs[key] for key in pattern.pattern.converters
+            }
+            found.append((name, reverse(name, kwargs=params)))
+    return found
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _login(client, user):
+    # Маршрут logout разлогинивает клиента: входим заново вне замера.
+    if SESSION_KEY not in client.session:
+        client.force_login(user)
+
+
+def measure(client, user, url, iterations, warmup=2, cold=False):
+    """Замер одного url: задержки, запросы к базе, пик памяти."""
+    for _ in range(warmup):
+        _login(client, user)
+        client.get(url)
+    timings = []
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+        _login(client, user)
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    if cold:
+        cache.clear()
+    _login(client, user)
+    # Журнал запросов ограничен по длине и очищается в начале каждого
+    # запроса, поэтому число снимаем сразу после замера.
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        client.get(url)
+    query_count = len(queries.captured_queries)
+
+    if cold:
+        cache.clear()
+    _login(client, user)
+    tracemalloc.start()
+    try:
+        client.get(url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'queries': query_count,
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run(dataset, iterations, warmup=2, cold=False, only=None):
+    """Обходит маршруты и возвращает результаты по каждому."""
+    client = Client()
+    results = []
+    for name, url in routes(dataset['kwargs']):
+        if only and name not in only:
+            continue
+        result = {'name': name, 'url': url}
+        try:
+            result.update(measure(
+                client, dataset['user'], url, iterations, warmup, cold
+            ))
+        except Exception as error:
+            # Упавший маршрут попадает в отчёт, а не обрывает прогон.
+            result['error'] = f'{type(error).__name__}: {error}'
+        results.append(result)
+    return results
+
+
+def compare(baseline, current, field='p95_ms'):
+    """Изменение field по маршрутам, которые есть в обоих отчётах."""
+    before = {item['name']: item for item in baseline['results']}
+    rows = []
+    for item in current['results']:
+        old = before.get(item['name'])
+        if not old or not old.get(field) or field not in item:
+            continue
+        change = (item[field] - old[field]) / old[field] * 100
+        rows.append((item['name'], old[field], item[field], change))
+    return rows
+
+
+def _feed_read(rng, user_ids):
+    list(Post.objects.for_feed()[:10])
+    list(Post.objects.for_feed().filter(author_id=rng.choice(user_ids))[:10])
+
+
+def _publish(rng, user_ids, post_ids):
+    with transaction.atomic():
+        Post.objects.create(
+            author_id=rng.choice(user_ids), text='Пост под нагрузкой'
+        )
+        Comment.objects.create(
+            post_id=rng.choice(post_ids), author_id=rng.choice(user_ids),
+            text='Комментарий под нагрузкой',
+        )
+
+
+def concurrency(readers=4, writers=1, seconds=5.0):
+    """Чтение лент в readers потоках, пока writers потоков публикуют.
+
+    У каждого потока своё соединение с базой. Ошибки «database is locked»
+    считаются отдельно и в задержки не входят.
+    """
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    post_ids = list(Post.objects.values_list('pk', flat=True)[:1000])
+    timings = {'read': [], 'write': []}
+    errors = {'read': 0, 'write': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(kind, index):
+        rng = random.Random(index)
+        done, failed = [], 0
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    if kind == 'read':
+                        _feed_read(rng, user_ids)
+                    else:
+                        _publish(rng, user_ids, post_ids)
+                except OperationalError:
+                    failed += 1
+                    continue
+                done.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection.close()
+        with lock:
+            timings[kind].extend(done)
+            errors[kind] += failed
+
+    threads = [
+        threading.Thread(target=worker, args=('read', index))
+        for index in range(readers)
+    ] + [
+        threading.Thread(target=worker, args=('write', readers + index))
+        for index in range(writers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    result = {}
+    for kind, done in timings.items():
+        result[kind] = {
+            'ops_per_s': round(len(done) / seconds, 1),
+            'p50_ms': round(percentile(done, 50), 3) if done else None,
+            'p95_ms': round(percentile(done, 95), 3) if done else None,
+            'errors': errors[kind],
+        }
+    return result
+
+
+def follow_graph(users, edges, random_seed=0):
+    """Рёбра (user_id, author_id) со степенным распределением авторов:
+    на немногих популярных подписано большинство."""
+    rng = random.Random(random_seed)
+    found = set()
+    while len(found) < edges:
+        user_id = rng.randrange(1, users + 1)
+        author_id = 1 + int(users * rng.random() ** 3)
+        if user_id != author_id:
+            found.add((user_id, author_id))
+    return list(found)
+
+
+def recommendations(users, edges, sample, backends=None, random_seed=0):
+    """Время расчёта кандидатов для sample случайных пользователей."""
+    graph = follow_graph(users, edges, random_seed)
+    user_ids = random.Random(random_seed).sample(
+        range(1, users + 1), min(sample, users)
+    )
+    if backends is None:
+        backends = ['python', 'sparse']
+    result = {'users': users, 'edges': len(graph), 'sample': len(user_ids)}
+    for backend in backends:
+        started = time.perf_counter()
+        found = list(follow_recommendations.score(
+            graph, user_ids, backend=backend
+        ))
+        seconds = time.perf_counter() - started
+        result[backend] = {
+            'seconds': round(seconds, 3),
+            'ms_per_user': round(seconds / len(found) * 1000, 3),
+            'candidates': sum(len(items) for _, items in found),
+        }
+    return result
@@ -0,0 +1,91 @@
+"""Число постов в ленте для постраничного вывода без COUNT(*) по таблице.
+
+Лента до POSTS_EXACT_COUNT_LIMIT постов считается точно, запросом с
+LIMIT: он читает не больше LIMIT + 1 строк индекса. Для ленты больше
+лимита берётся число из кэша, которое пересчитывается в фоне не чаще
+раза в POSTS_COUNT_REFRESH секунд. Пока его нет, используется оценка
+планировщика (sqlite_stat1 после ANALYZE или pg_class.reltuples) для всей
+таблицы или нижняя граница LIMIT + 1. Номера последних страниц большой
+ленты поэтому приблизительны.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+
+from core.tasks import run_in_background
+
+logger = logging.getLogger(__name__)
+
+
+def _count_key(name):
+    return f'count:{name}'
+
+
+def table_estimate(queryset):
+    """Оценка числа строк таблицы по статистике базы или None."""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples FROM pg_class WHERE oid = %s::regclass'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        # sqlite_stat1 появляется только после первого ANALYZE.
+        return None
+    if row is None:
+        return None
+    # В sqlite_stat1 — строка «число_строк ...», в reltuples — float,
+    # равный -1, пока таблицу не анализировали.
+    try:
+        estimate = int(float(str(row[0]).split()[0]))
+    except (IndexError, ValueError):
+        return None
+    return estimate if estimate >= 0 else None
+
+
+def _recount(name, queryset):
+    try:
+        cache.set(_count_key(name), (queryset.count(), time.time()), None)
+    except DatabaseError:
+        logger.exception('Не удалось пересчитать ленту %s', name)
+    finally:
+        cache.delete(f'count-lock:{name}')
+
+
+def _schedule_recount(name, queryset):
+    # Один пересчёт ленты за раз, сколько бы запросов его ни просили.
+    if cache.add(f'count-lock:{name}', 1, settings.POSTS_COUNT_REFRESH):
+        run_in_background(_recount, name, queryset)
+
+
+def feed_count(name, queryset):
+    """Число записей ленты name: точное для небольших, иначе из кэша."""
+    queryset = queryset.order_by()
+    limit = settings.POSTS_EXACT_COUNT_LIMIT
+    if limit is None:
+        return queryset.count()
+    capped = queryset[:limit + 1].count()
+    if capped <= limit:
+        return capped
+    cached = cache.get(_count_key(name))
+    if cached is None or (
+        time.time() - cached[1] > settings.POSTS_COUNT_REFRESH
+    ):
+        _schedule_recount(name, queryset)
+        # При BACKGROUND_WORKERS = 0 пересчёт уже выполнен.
+        cached = cache.get(_count_key(name))
+    if cached is not None:
+        return max(cached[0], capped)
+    estimate = None
+    if not queryset.query.where:
+        estimate = table_estimate(queryset)
+    return max(estimate or 0, capped)
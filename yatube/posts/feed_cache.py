@@ -0,0 +1,105 @@
+"""Версионированные ключи кэша лент.
+
+У каждой ленты есть счётчик поколения: главная ('index'), группа
+('group:<id>'), профиль ('profile:<id>') и подписки ('follow:<id>').
+Сигналы увеличивают счётчик при изменении постов, подписок и
+комментариев, а страница в кэше хранится вместе с поколением, по
+которому собрана: со сменой поколения она пересобирается (core.swr),
+а ключи с поколением внутри просто перестают читаться. Рядом с
+поколением хранится время его смены — для Last-Modified в API.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Follow
+
+
+def _generation_key(name):
+    return f'gen:{name}'
+
+
+def _modified_key(name):
+    return f'modified:{name}'
+
+
+def _initial():
+    # Не ноль: если счётчик вытеснили из кэша, новый не должен совпасть
+    # с поколением ещё живых старых записей.
+    return time.time_ns()
+
+
+def generation(name):
+    key = _generation_key(name)
+    value = cache.get(key)
+    if value is None:
+        value = _initial()
+        if cache.add(key, value, None):
+            cache.set(_modified_key(name), time.time(), None)
+        else:
+            value = cache.get(key, value)
+    return value
+
+
+def bump(*names):
+    """Делает устаревшими закэшированные страницы перечисленных лент."""
+    for name in names:
+        key = _generation_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial(), None)
+    now = time.time()
+    cache.set_many({_modified_key(name): now for name in names}, None)
+
+
+def last_modified(names):
+    """Когда последний раз менялась любая из лент, или None."""
+    known = cache.get_many([_modified_key(name) for name in names])
+    if len(known) < len(names):
+        return None
+    return datetime.fromtimestamp(max(known.values()), timezone.utc)
+
+
+def post_feeds(post):
+    """Ленты, в которых показывается пост, и его собственная страница."""
+    names = ['index', f'profile:{post.author_id}', f'post:{post.pk}']
+    if post.group_id:
+        names.append(f'group:{post.group_id}')
+    return names
+
+
+def feed_key(name):
+    return f'{name}:{generation(name)}'
+
+
+def follow_feed_names(user_id):
+    """Ленты, из которых складывается лента подписок: своя и профили
+    авторов, на которых подписан пользователь."""
+    name = f'follow:{user_id}'
+    own = generation(name)
+    authors_key = f'follow_authors:{user_id}:{own}'
+    author_ids = cache.get(authors_key)
+    if author_ids is None:
+        author_ids = sorted(Follow.objects.filter(
+            user_id=user_id
+        ).values_list('author_id', flat=True))
+        cache.set(authors_key, author_ids, settings.POSTS_FEED_CACHE_TIMEOUT)
+    return [name] + [f'profile:{pk}' for pk in author_ids]
+
+
+def follow_feed_key(user_id):
+    """Ключ ленты подписок: меняется при подписке, отписке и любом
+    изменении постов у авторов, на которых подписан пользователь."""
+    name, *names = follow_feed_names(user_id)
+    own = generation(name)
+    known = cache.get_many([_generation_key(name) for name in names])
+    versions = ','.join(
+        str(known.get(_generation_key(name)) or generation(name))
+        for name in names
+    )
+    digest = hashlib.md5(versions.encode()).hexdigest()
+    return f'{name}:{own}:{digest}'
@@ -1,6 +1,11 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
+from django.template.defaultfilters import filesizeformat
 from django.utils.translation import gettext_lazy as _
 
+from . import uploads
 from .models import Post, Comment
 
 
@@ -18,6 +23,50 @@ class PostForm(ModelForm):
             'image': _('Картинка к посту'),
         }
 
+    def __init__(self, *args, rejected_uploads=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rejected_uploads = rejected_uploads
+        self.image_processing_ms = None
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if 'image' in self.rejected_uploads:
+            raise ValidationError(
+                _('Картинка больше %(limit)s.'), code='too_large',
+                params={
+                    'limit': filesizeformat(
+                        settings.POSTS_IMAGE_MAX_UPLOAD_SIZE
+                    ),
+                },
+            )
+        if not isinstance(image, UploadedFile):
+            return image
+        # ImageField уже открыл картинку: прочитан только заголовок,
+        # пиксели не декодировались.
+        header = image.image
+        if header.format not in settings.POSTS_IMAGE_FORMATS:
+            raise ValidationError(
+                _('Формат %(format)s не поддерживается.'), code='bad_format',
+                params={'format': header.format},
+            )
+        width, height = header.size
+        if width * height > settings.POSTS_IMAGE_MAX_PIXELS:
+            raise ValidationError(
+                _('Слишком большое разрешение картинки.'),
+                code='too_many_pixels',
+            )
+        if (header.format not in uploads.DRAFT_FORMATS
+                and width * height > settings.POSTS_IMAGE_MAX_DECODED_PIXELS):
+            # PNG и WebP при уменьшении декодируются целиком.
+            raise ValidationError(
+                _('Слишком большое разрешение картинки.'),
+                code='too_many_pixels',
+            )
+        image, self.image_processing_ms = uploads.process_image(
+            image, header
+        )
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,102 @@
+import json
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.runner import DiscoverRunner
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment,
+)
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет временную тестовую базу и замеряет все маршруты posts, '
+        'api и users: перцентили задержки, запросы к базе, пик памяти.'
+    )
+
+    def add_arguments(self, parser):
+        for name, default in benchmark.DATASET.items():
+            parser.add_argument(
+                f'--{name}', type=int, default=default,
+                help=f'Размер набора данных: {name} (по умолчанию '
+                     f'{default}).',
+            )
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--route', action='append', dest='routes',
+            help='Замерить только этот маршрут, например posts:index. '
+                 'Можно повторять.',
+        )
+        parser.add_argument(
+            '--output', help='Записать отчёт JSON в файл, а не в stdout.',
+        )
+        parser.add_argument(
+            '--compare', help='Отчёт JSON прошлого прогона для сравнения.',
+        )
+
+    def handle(self, *args, **options):
+        dataset_options = {
+            name: options[name] for name in benchmark.DATASET
+        }
+        # С DEBUG = True каждый запрос к базе пишется в журнал, что
+        # искажает и время, и память.
+        setup_test_environment(debug=False)
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        media_root = tempfile.mkdtemp()
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                dataset = benchmark.seed(
+                    random_seed=options['seed'], **dataset_options
+                )
+                results = benchmark.run(
+                    dataset, options['iterations'], options['warmup'],
+                    options['cold'], options['routes'],
+                )
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        report = {
+            'dataset': dataset_options,
+            'iterations': options['iterations'],
+            'cold': options['cold'],
+            'cache': settings.CACHE_KIND,
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+            for item in results:
+                if 'error' in item:
+                    self.stdout.write(f"{item['name']:<32} {item['error']}")
+                    continue
+                self.stdout.write(
+                    f"{item['name']:<32} p50 {item['p50_ms']:>8.2f} ms  "
+                    f"p95 {item['p95_ms']:>8.2f} ms  "
+                    f"queries {item['queries']:>3}  "
+                    f"memory {item['peak_memory_kb']:>8.1f} KB"
+                )
+        else:
+            self.stdout.write(
+                json.dumps(report, ensure_ascii=False, indent=2)
+            )
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                rows = benchmark.compare(json.load(baseline), report)
+            for name, before, after, change in rows:
+                self.stderr.write(
+                    f'{name:<32} p95 {before:.2f} -> {after:.2f} ms '
+                    f'({change:+.1f}%)'
+                )
@@ -0,0 +1,50 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет расчёт кандидатов в подписки на синтетическом графе '
+        'подписок в памяти, для каждого доступного способа расчёта.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200_000)
+        parser.add_argument('--edges', type=int, default=2_000_000)
+        parser.add_argument(
+            '--sample', type=int, default=200,
+            help='Для скольких пользователей считать кандидатов.',
+        )
+        parser.add_argument(
+            '--backend', action='append', dest='backends',
+            choices=('sparse', 'python'),
+            help='Способ расчёта; можно повторять. По умолчанию — все '
+                 'доступные.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', help='Записать отчёт JSON в файл.',
+        )
+
+    def handle(self, *args, **options):
+        report = benchmark.recommendations(
+            options['users'], options['edges'], options['sample'],
+            options['backends'], options['seed'],
+        )
+        self.stdout.write(
+            f'рёбер: {report["edges"]}, пользователей в выборке: '
+            f'{report["sample"]}'
+        )
+        for backend in options['backends'] or ('python', 'sparse'):
+            if backend in report:
+                result = report[backend]
+                self.stdout.write(
+                    f'{backend:<8} {result["seconds"]:>9} с '
+                    f'{result["ms_per_user"]:>9} мс/польз.'
+                )
+        if options['output']:
+            with open(options['output'], 'w') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import override_settings
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает профили SQLite из SQLITE_PROFILES: пропускная '
+        'способность и задержки чтения лент под нагрузкой записи. '
+        'Каждый профиль получает свой временный файл базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile', action='append', dest='profiles',
+            choices=settings.SQLITE_PROFILES,
+            help='Профиль; можно повторять. По умолчанию — все.',
+        )
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=1)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument(
+            '--output', help='Записать отчёт JSON в файл.',
+        )
+
+    def use_database(self, settings_dict):
+        connections.close_all()
+        try:
+            del connections[DEFAULT_DB_ALIAS]
+        except AttributeError:
+            pass
+        connections.databases[DEFAULT_DB_ALIAS] = settings_dict
+        connections.ensure_defaults(DEFAULT_DB_ALIAS)
+        connections.prepare_test_settings(DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'] or list(settings.SQLITE_PROFILES)
+        original = connections.databases[DEFAULT_DB_ALIAS]
+        report = {}
+        try:
+            for name in profiles:
+                with tempfile.TemporaryDirectory() as directory, \
+                        override_settings(DEBUG=False):
+                    self.use_database({
+                        **settings.SQLITE_PROFILES[name],
+                        'NAME': os.path.join(directory, 'bench.sqlite3'),
+                    })
+                    call_command('migrate', verbosity=0)
+                    benchmark.seed(
+                        users=50, groups=5, posts=options['posts'],
+                        images=0, comments=options['posts'], follows=10,
+                    )
+                    report[name] = benchmark.concurrency(
+                        options['readers'], options['writers'],
+                        options['seconds'],
+                    )
+                    connections.close_all()
+        finally:
+            self.use_database(original)
+
+        self.stdout.write(
+            f'{"профиль":<12} {"чтений/с":>9} {"p95 чт.":>9} '
+            f'{"записей/с":>10} {"p95 зап.":>9} {"ошибки":>7}'
+        )
+        for name, result in report.items():
+            read, write = result['read'], result['write']
+            self.stdout.write(
+                f'{name:<12} {read["ops_per_s"]:>9} '
+                f'{read["p95_ms"] or "-":>9} {write["ops_per_s"]:>10} '
+                f'{write["p95_ms"] or "-":>9} '
+                f'{read["errors"] + write["errors"]:>7}'
+            )
+        if options['output']:
+            with open(options['output'], 'w') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
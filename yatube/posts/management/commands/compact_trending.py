@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из рейтинга популярного затухшие посты. Запускать '
+        'по расписанию, например раз в час.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Собрать рейтинг заново по недавним комментариям.',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = trending.rebuild()
+            self.stdout.write(self.style.SUCCESS(
+                f'Рейтинг собран заново, постов: {count}.'
+            ))
+            return
+        deleted = trending.compact()
+        self.stdout.write(self.style.SUCCESS(f'Удалено строк: {deleted}.'))
@@ -0,0 +1,41 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, посты, комментарии или подписки в NDJSON или '
+        'CSV потоком, не загружая таблицу в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=transfer.MODELS)
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл выгрузки; «-» — stdout.',
+        )
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS,
+            help='По умолчанию — по расширению файла, иначе ndjson.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson'
+        )
+        rows = transfer.export_rows(options['model'], options['batch_size'])
+        if path == '-':
+            count = transfer.write_rows(
+                sys.stdout, options['model'], rows, fmt
+            )
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                count = transfer.write_rows(
+                    stream, options['model'], rows, fmt
+                )
+        self.stderr.write(f'{options["model"]}: выгружено {count}.')
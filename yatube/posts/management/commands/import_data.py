@@ -0,0 +1,82 @@
+import os
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии или подписки из NDJSON или '
+        'CSV пачками. Прерванную загрузку из файла можно продолжить '
+        'с --resume.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=transfer.MODELS)
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл выгрузки; «-» — stdin.',
+        )
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS,
+            help='По умолчанию — по расширению файла, иначе ndjson.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить с последней сохранённой пачки.',
+        )
+        parser.add_argument(
+            '--no-rebuild', action='store_false', dest='rebuild',
+            help='Не пересобирать счётчики, ленты и поиск (например, '
+                 'чтобы сделать это один раз после всех загрузок).',
+        )
+
+    def handle(self, *args, **options):
+        name, path = options['model'], options['path']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson'
+        )
+        if path == '-':
+            if options['resume']:
+                raise CommandError('--resume работает только с файлом.')
+            processed, skipped = self.load(
+                sys.stdin.buffer, name, fmt, options['batch_size']
+            )
+        else:
+            checkpoint = f'{path}.offset'
+            offset = 0
+            if options['resume'] and os.path.exists(checkpoint):
+                with open(checkpoint) as stream:
+                    offset = int(stream.read() or 0)
+            with open(path, 'rb') as raw:
+                processed, skipped = self.load(
+                    raw, name, fmt, options['batch_size'], offset,
+                    checkpoint, os.fstat(raw.fileno()).st_size,
+                )
+            if os.path.exists(checkpoint):
+                os.remove(checkpoint)
+        if options['rebuild']:
+            transfer.rebuild_derived([name])
+        self.stdout.write(self.style.SUCCESS(
+            f'{name}: загружено {processed - skipped}, '
+            f'пропущено без связанных записей {skipped}.'
+        ))
+
+    def load(self, raw, name, fmt, batch_size, offset=0, checkpoint=None,
+             size=None):
+        def on_batch(processed, skipped, position):
+            if checkpoint is not None:
+                with open(checkpoint, 'w') as stream:
+                    stream.write(str(position))
+            done = f' ({position * 100 // size}%)' if size else ''
+            self.stderr.write(f'{name}: {processed} записей{done}')
+
+        try:
+            rows = transfer.read_rows(raw, name, fmt, offset)
+            return transfer.import_rows(name, rows, batch_size, on_batch)
+        except (ValueError, ValidationError) as exc:
+            raise CommandError(exc)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики AuthorStats по таблицам постов, '
+        'подписок и комментариев.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Только сверить счётчики, ничего не записывая.',
+        )
+
+    def handle(self, *args, **options):
+        mismatches = stats.rebuild(verify=options['verify'])
+        for user_id, field, stored, actual in mismatches:
+            self.stdout.write(
+                f'user={user_id} {field}: {stored} -> {actual}'
+            )
+        if options['verify'] and mismatches:
+            raise CommandError(f'Расхождений: {len(mismatches)}.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики в порядке, исправлено: {len(mismatches)}.'
+        ))
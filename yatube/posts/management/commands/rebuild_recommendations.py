@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает кандидатов в подписки FollowCandidate по всей '
+        'таблице подписок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend', choices=('sparse', 'python'),
+            help='По умолчанию sparse.',
+        )
+
+    def handle(self, *args, **options):
+        recommendations.rebuild(backend=options['backend'])
+        self.stdout.write(self.style.SUCCESS('Кандидаты пересчитаны.'))
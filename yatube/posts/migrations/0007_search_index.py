@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from posts import search
+
+    backend = search.get_backend(schema_editor.connection)
+    if backend is None:
+        return
+    backend.install(schema_editor)
+    Post = apps.get_model('posts', 'Post')
+    backend.rebuild(
+        Post.objects.using(schema_editor.connection.alias)
+        .values_list('pk', 'text').iterator()
+    )
+
+
+def uninstall(apps, schema_editor):
+    from posts import search
+
+    backend = search.get_backend(schema_editor.connection)
+    if backend is not None:
+        backend.uninstall(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_postrendition'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
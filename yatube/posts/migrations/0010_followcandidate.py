@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0009_postscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowCandidate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Оценка')),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follow_candidates', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-score',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='followcandidate',
+            index=models.Index(fields=['user', '-score'], name='candidate_user_score_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='followcandidate',
+            constraint=models.UniqueConstraint(fields=('user', 'candidate'), name='unique_follow_candidate'),
+        ),
+    ]
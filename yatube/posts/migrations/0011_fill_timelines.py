@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def fill_timelines(apps, schema_editor):
+    # Ленты подписок читаются только из TimelineEntry, поэтому подписки,
+    # сделанные до появления таблицы, раскладываем сразу.
+    from posts import timeline
+
+    timeline.fill(
+        models=(
+            apps.get_model('posts', 'Follow'),
+            apps.get_model('posts', 'Post'),
+            apps.get_model('posts', 'TimelineEntry'),
+        ),
+        using=schema_editor.connection.alias,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_followcandidate'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -16,6 +16,15 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для лент: автор и группа подтягиваются тем же запросом,
+        копии картинок — одним запросом на страницу."""
+        return self.select_related('author', 'group').defer(
+            'author__password', 'group__description'
+        ).prefetch_related('renditions')
+
+
 class Post(CreatedModel):
     text = models.TextField(
         'Текст поста',
@@ -41,11 +50,25 @@ class Post(CreatedModel):
         upload_to='posts/',
         blank=True
     )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=('author', '-pub_date'), name='post_author_date_idx'
+            ),
+            models.Index(
+                fields=('group', '-pub_date'), name='post_group_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -75,6 +98,11 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=('post', '-created'), name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text[:15]
@@ -91,3 +119,128 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following',
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'
+            ),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Счётчики пользователя, поддерживаемые сигналами вместо COUNT(*)."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'Статистика {self.user_id}'
+
+
+class TimelineEntry(models.Model):
+    """Запись ленты подписок, разложенная подписчику при публикации."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField('Дата публикации поста')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date'), name='timeline_user_date_idx'
+            ),
+        ]
+
+
+class PostRendition(models.Model):
+    """Уменьшенная копия картинки поста в одном из форматов."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='renditions',
+    )
+    image = models.ImageField(upload_to='posts/renditions/')
+    format = models.CharField('Формат', max_length=10)
+    width = models.PositiveIntegerField('Ширина')
+    height = models.PositiveIntegerField('Высота')
+
+    class Meta:
+        ordering = ('width',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('post', 'format', 'width'),
+                name='unique_post_rendition',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.format} {self.width}x{self.height}'
+
+
+class PostScore(models.Model):
+    """Рейтинг поста в популярном, см. posts.trending."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+    )
+    score = models.FloatField('Рейтинг')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=('-score',), name='postscore_score_idx'),
+        ]
+
+
+class FollowCandidate(models.Model):
+    """Кандидат в подписки пользователя, см. posts.recommendations."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_candidates',
+    )
+    candidate = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        ordering = ('-score',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'candidate'), name='unique_follow_candidate'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-score'), name='candidate_user_score_idx'
+            ),
+        ]
@@ -0,0 +1,143 @@
+import base64
+import binascii
+from collections.abc import Sequence
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(obj, field='pub_date'):
+    """Упаковывает ключ (дата, id) записи в непрозрачный токен."""
+    raw = f'{getattr(obj, field).isoformat()}|{obj.pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (дата, id) из токена или None, если токен битый."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        pub_date, pk = raw.rsplit('|', 1)
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+ELLIPSIS = '…'
+
+
+def elided_page_range(page_obj, on_each_side=2, on_ends=1):
+    """Номера страниц вокруг текущей и по краям, с ELLIPSIS в пропусках.
+
+    Ссылок всегда не больше 2 * (on_each_side + on_ends) + 3, сколько бы
+    страниц ни было.
+    """
+    number = page_obj.number
+    num_pages = page_obj.paginator.num_pages
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        yield from range(1, num_pages + 1)
+        return
+    # Пропуск ставится, только если прячет хотя бы две страницы.
+    if number > on_each_side + on_ends + 2:
+        yield from range(1, on_ends + 1)
+        yield ELLIPSIS
+        yield from range(number - on_each_side, number + 1)
+    else:
+        yield from range(1, number + 1)
+    if number < num_pages - on_each_side - on_ends - 1:
+        yield from range(number + 1, number + on_each_side + 1)
+        yield ELLIPSIS
+        yield from range(num_pages - on_ends + 1, num_pages + 1)
+    else:
+        yield from range(number + 1, num_pages + 1)
+
+
+class KeysetPage(Sequence):
+    """Страница ленты без номера и без общего количества записей."""
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[-1], self.paginator.field)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[0], self.paginator.field)
+
+
+class KeysetPaginator:
+    """Постраничный вывод по ключу (pub_date, id).
+
+    В отличие от Paginator не делает COUNT(*) и OFFSET: каждая страница —
+    это диапазонный запрос по индексу относительно ключа соседней записи,
+    поэтому новые посты не сдвигают уже открытые страницы. field — поле
+    даты, по которому идёт ключ (для комментариев — created).
+    """
+
+    def __init__(self, object_list, per_page, field='pub_date'):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.field = field
+
+    def get_page(self, after=None, before=None):
+        """Страница после токена after, перед токеном before или первая."""
+        after_key = decode_cursor(after)
+        before_key = decode_cursor(before) if after_key is None else None
+        queryset = self.object_list
+        field = self.field
+        if before_key is not None:
+            date, pk = before_key
+            queryset = queryset.filter(
+                Q(**{f'{field}__gt': date})
+                | Q(**{field: date, 'pk__gt': pk})
+            ).order_by(field, 'pk')
+            posts = list(queryset[:self.per_page + 1])
+            has_previous = len(posts) > self.per_page
+            posts = posts[:self.per_page][::-1]
+            return KeysetPage(posts, self, True, has_previous)
+        queryset = queryset.order_by(f'-{field}', '-pk')
+        if after_key is not None:
+            date, pk = after_key
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': date})
+                | Q(**{field: date, 'pk__lt': pk})
+            )
+        posts = list(queryset[:self.per_page + 1])
+        has_next = len(posts) > self.per_page
+        return KeysetPage(
+            posts[:self.per_page], self, has_next, after_key is not None
+        )
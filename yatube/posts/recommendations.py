@@ -0,0 +1,250 @@
+"""Кого почитать: кандидаты в подписки по графу Follow.
+
+Оценка кандидата c для пользователя u складывается из двух частей:
+
+* друзья друзей — сколько авторов из подписок u сами подписаны на c,
+  с весом POSTS_RECOMMENDATIONS_FOF_WEIGHT;
+* похожие читатели — сумма по пользователям v, у которых с u общие
+  подписки, косинусной близости u и v (общие подписки на корень из
+  произведения их числа) по всем подпискам v, с весом
+  POSTS_RECOMMENDATIONS_COFOLLOW_WEIGHT.
+
+Лучшие POSTS_RECOMMENDATIONS_SIZE кандидатов хранятся в FollowCandidate.
+rebuild() считает их по всей таблице Follow матрицами scipy.sparse.
+После подписки или отписки refresh() в фоне точно пересчитывает
+подписчика и тех, кто подписан на него, по их окрестности в графе, тем
+же алгоритмом на словарях: на маленьком подграфе он быстрее матриц. Две
+вещи дожидаются следующего rebuild() (команда rebuild_recommendations):
+вклад похожих читателей через авторов с более чем
+POSTS_RECOMMENDATIONS_MAX_FOLLOWERS подписчиками и изменения оценок
+у остальных читателей, похожих на подписчика.
+"""
+import heapq
+import math
+from collections import Counter
+
+import numpy
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from core.tasks import run_in_background
+
+from .models import AuthorStats, Follow, FollowCandidate
+
+BATCH_SIZE = 500
+
+
+def _weights():
+    return (
+        settings.POSTS_RECOMMENDATIONS_FOF_WEIGHT,
+        settings.POSTS_RECOMMENDATIONS_COFOLLOW_WEIGHT,
+    )
+
+
+def _python_scores(edges, user_ids, limit):
+    following, followers = {}, {}
+    for user_id, author_id in edges:
+        following.setdefault(user_id, set()).add(author_id)
+        followers.setdefault(author_id, set()).add(user_id)
+    fof_weight, cofollow_weight = _weights()
+    for user_id in following if user_ids is None else user_ids:
+        mine = following.get(user_id, set())
+        scores = Counter()
+        for author_id in mine:
+            for candidate in following.get(author_id, ()):
+                scores[candidate] += fof_weight
+        shared = Counter(
+            other
+            for author_id in mine
+            for other in followers[author_id] if other != user_id
+        )
+        for other, common in shared.items():
+            theirs = following[other]
+            weight = cofollow_weight * common / math.sqrt(
+                len(mine) * len(theirs)
+            )
+            for candidate in theirs:
+                scores[candidate] += weight
+        for excluded in mine | {user_id}:
+            scores.pop(excluded, None)
+        yield user_id, heapq.nsmallest(
+            limit, scores.items(), key=lambda item: (-item[1], item[0])
+        )
+
+
+def _sparse_top(ids, candidates, scores, limit):
+    if len(candidates) > limit:
+        best = numpy.argpartition(-scores, limit)[:limit]
+        candidates, scores = candidates[best], scores[best]
+    order = numpy.lexsort((ids[candidates], -scores))
+    return [
+        (int(ids[candidate]), float(score))
+        for candidate, score in zip(candidates[order], scores[order])
+    ]
+
+
+def _sparse_scores(edges, user_ids, limit, chunk_size=1000):
+    pairs = numpy.array(edges, dtype=numpy.int64).reshape(-1, 2)
+    ids, index = numpy.unique(pairs, return_inverse=True)
+    index = index.reshape(-1, 2)
+    size = len(ids)
+    adjacency = sparse.csr_matrix(
+        (numpy.ones(len(index)), (index[:, 0], index[:, 1])),
+        shape=(size, size),
+    )
+    transposed = adjacency.T.tocsr()
+    degree = numpy.asarray(adjacency.sum(axis=1)).ravel()
+    scale = numpy.zeros(size)
+    scale[degree > 0] = 1 / numpy.sqrt(degree[degree > 0])
+    if user_ids is None:
+        rows = numpy.flatnonzero(degree)
+    else:
+        wanted = numpy.array(sorted(user_ids), dtype=numpy.int64)
+        positions = numpy.searchsorted(ids, wanted)
+        found = positions < size
+        found[found] = ids[positions[found]] == wanted[found]
+        for user_id in wanted[~found]:
+            yield int(user_id), []
+        rows = positions[found]
+    fof_weight, cofollow_weight = _weights()
+    # Строки обрабатываются пачками: произведения по всей матрице сразу
+    # на миллионах рёбер не помещаются в память.
+    for start in range(0, len(rows), chunk_size):
+        block = rows[start:start + chunk_size]
+        mine = adjacency[block]
+        overlap = (mine @ transposed).tocoo()
+        other = overlap.row, overlap.col
+        keep = other[1] != block[other[0]]
+        similarity = sparse.csr_matrix(
+            (
+                overlap.data[keep] * scale[block[other[0][keep]]]
+                * scale[other[1][keep]],
+                (other[0][keep], other[1][keep]),
+            ),
+            shape=overlap.shape,
+        )
+        # Друзья друзей и похожие читатели — одно произведение:
+        # (a * mine + b * similarity) @ adjacency.
+        total = (
+            (fof_weight * mine + cofollow_weight * similarity) @ adjacency
+        ).tocsr()
+        # Уже подписанных и самого пользователя убираем маской.
+        excluded = (mine + sparse.csr_matrix(
+            (numpy.ones(len(block)), (numpy.arange(len(block)), block)),
+            shape=mine.shape,
+        )).astype(bool)
+        total = total - total.multiply(excluded)
+        total.eliminate_zeros()
+        for offset, row in enumerate(block):
+            span = slice(total.indptr[offset], total.indptr[offset + 1])
+            yield int(ids[row]), _sparse_top(
+                ids, total.indices[span], total.data[span], limit
+            )
+
+
+def score(edges, user_ids=None, limit=None, backend=None):
+    """Лучшие кандидаты по рёбрам (user_id, author_id).
+
+    Отдаёт пары (user_id, [(candidate_id, оценка), ...]) для user_ids
+    или для всех, у кого есть подписки. backend — 'sparse' (по
+    умолчанию) или 'python'.
+    """
+    limit = limit or settings.POSTS_RECOMMENDATIONS_SIZE
+    if backend == 'python':
+        return _python_scores(edges, user_ids, limit)
+    return _sparse_scores(edges, user_ids, limit)
+
+
+def _in_batches(queryset, field, ids):
+    # Пачками: у SQLite ограничено число параметров в запросе.
+    ids = sorted(ids)
+    found = set()
+    for start in range(0, len(ids), BATCH_SIZE):
+        found.update(queryset.filter(
+            **{f'{field}__in': ids[start:start + BATCH_SIZE]}
+        ))
+    return found
+
+
+def _edges(field, ids):
+    return _in_batches(
+        Follow.objects.values_list('user_id', 'author_id'), field, ids
+    )
+
+
+def _neighbourhood(user_ids):
+    """Рёбра, от которых зависят оценки user_ids."""
+    edges = _edges('user_id', user_ids)
+    authors = {author_id for _, author_id in edges}
+    edges |= _edges('user_id', authors)
+    crowded = _in_batches(
+        AuthorStats.objects.filter(
+            followers_count__gt=settings.POSTS_RECOMMENDATIONS_MAX_FOLLOWERS,
+        ).values_list('user_id', flat=True),
+        'user_id', authors,
+    )
+    shared = _edges('author_id', authors - crowded)
+    edges |= shared
+    others = {user_id for user_id, _ in shared} - set(user_ids)
+    return edges | _edges('user_id', others)
+
+
+def _store(results):
+    for user_id, candidates in results:
+        FollowCandidate.objects.filter(user_id=user_id).delete()
+        FollowCandidate.objects.bulk_create([
+            FollowCandidate(
+                user_id=user_id, candidate_id=candidate_id, score=value
+            )
+            for candidate_id, value in candidates
+        ])
+
+
+def _store_batches(results):
+    batch = []
+    for result in results:
+        batch.append(result)
+        if len(batch) == BATCH_SIZE:
+            with transaction.atomic():
+                _store(batch)
+            batch = []
+    with transaction.atomic():
+        _store(batch)
+
+
+def refresh(user_ids):
+    """Пересчитывает кандидатов user_ids по их окрестности в графе."""
+    user_ids = set(user_ids)
+    _store_batches(
+        score(_neighbourhood(user_ids), user_ids, backend='python')
+    )
+
+
+def rebuild(backend=None):
+    """Пересчитывает кандидатов всех пользователей по всей таблице."""
+    edges = list(Follow.objects.values_list('user_id', 'author_id'))
+    _store_batches(score(edges, backend=backend))
+    # Отписавшиеся от всех в результатах не встретились.
+    FollowCandidate.objects.filter(user__follower__isnull=True).delete()
+
+
+def on_follow_change(user_id, author_id):
+    """Подписка или отписка меняет кандидатов подписчика и тех, кто
+    подписан на него (для них он «друг»)."""
+    FollowCandidate.objects.filter(
+        user_id=user_id, candidate_id=author_id
+    ).delete()
+    affected = [user_id] + list(Follow.objects.filter(
+        author_id=user_id
+    ).values_list('user_id', flat=True)[
+        :settings.POSTS_RECOMMENDATIONS_REFRESH_LIMIT
+    ])
+    run_in_background(refresh, affected)
+
+
+def for_user(user):
+    """Кандидаты в подписки user, лучшие первыми."""
+    return FollowCandidate.objects.filter(user=user).select_related(
+        'candidate'
+    ).order_by('-score')[:settings.POSTS_RECOMMENDATIONS_SIZE]
@@ -0,0 +1,136 @@
+"""Картинки поста в нескольких ширинах и форматах для srcset.
+
+Копии режутся под пропорции карточки ленты и сохраняются в
+PostRendition вместе с размерами. Современные форматы включаются, только
+если их умеет кодировать установленный Pillow: WebP — с libwebp, AVIF —
+с плагином pillow-avif-plugin.
+"""
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+from core import metrics
+
+from . import feed_cache
+from .models import Post, PostRendition
+
+try:
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+logger = logging.getLogger(__name__)
+
+MIME_TYPES = {
+    'AVIF': 'image/avif',
+    'WEBP': 'image/webp',
+    'JPEG': 'image/jpeg',
+}
+
+EXTENSIONS = {
+    'AVIF': 'avif',
+    'WEBP': 'webp',
+    'JPEG': 'jpg',
+}
+
+
+def available_formats():
+    """Форматы из POSTS_RENDITION_FORMATS, которые Pillow может записать."""
+    supported = {'JPEG'}
+    if features.check('webp'):
+        supported.add('WEBP')
+    if 'AVIF' in Image.SAVE:
+        supported.add('AVIF')
+    return [
+        fmt for fmt in settings.POSTS_RENDITION_FORMATS if fmt in supported
+    ]
+
+
+def _target_sizes(source_width):
+    ratio_width, ratio_height = settings.POSTS_RENDITION_RATIO
+    widths = [
+        width for width in settings.POSTS_RENDITION_WIDTHS
+        if width <= source_width
+    ] or [min(settings.POSTS_RENDITION_WIDTHS)]
+    return [
+        (width, max(1, round(width * ratio_height / ratio_width)))
+        for width in widths
+    ]
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    image.save(
+        buffer, fmt, quality=settings.POSTS_RENDITION_QUALITY, optimize=True
+    )
+    return buffer.getvalue()
+
+
+def generate(post):
+    """Пересоздаёт все копии картинки поста."""
+    for rendition in post.renditions.all():
+        rendition.image.delete(save=False)
+    post.renditions.all().delete()
+    if not post.image:
+        return []
+    with post.image.open('rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    stem = os.path.splitext(os.path.basename(post.image.name))[0]
+    created = []
+    for width, height in _target_sizes(image.width):
+        resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        for fmt in available_formats():
+            rendition = PostRendition(
+                post=post, format=fmt, width=width, height=height
+            )
+            name = f'{post.pk}/{stem}-{width}.{EXTENSIONS[fmt]}'
+            rendition.image.save(
+                name, ContentFile(_encode(resized, fmt)), save=False
+            )
+            created.append(rendition)
+    return PostRendition.objects.bulk_create(created)
+
+
+def generate_by_id(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return
+    try:
+        with metrics.timed_thumbnail('rendition'):
+            generate(post)
+    except Exception:
+        logger.exception('Не удалось подготовить копии поста %s', post_id)
+        return
+    # Копии готовы позже сохранения поста: ETag лент API должен смениться.
+    feed_cache.bump(*feed_cache.post_feeds(post))
+
+
+def picture(renditions):
+    """Данные для <picture>: источники по форматам и запасная <img>."""
+    by_format = {}
+    for rendition in sorted(renditions, key=lambda item: item.width):
+        by_format.setdefault(rendition.format, []).append(rendition)
+    fallback = by_format.pop('JPEG', None)
+    if not fallback:
+        return None
+    largest = fallback[-1]
+    return {
+        'sources': [
+            {'type': MIME_TYPES[fmt], 'srcset': _srcset(by_format[fmt])}
+            for fmt in MIME_TYPES if fmt in by_format
+        ],
+        'srcset': _srcset(fallback),
+        'src': largest.image.url,
+        'width': largest.width,
+        'height': largest.height,
+        'sizes': settings.POSTS_RENDITION_SIZES,
+    }
+
+
+def _srcset(renditions):
+    return ', '.join(f'{item.image.url} {item.width}w' for item in renditions)
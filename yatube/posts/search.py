@@ -0,0 +1,245 @@
+"""Полнотекстовый поиск по постам.
+
+Индекс обновляется сигналами при сохранении и удалении поста. На SQLite
+это таблица FTS5 posts_search с основами слов из posts.stemmer; на
+PostgreSQL — GIN-индекс по to_tsvector('russian', text), который база
+обновляет сама. Обе реализации отдают пары (score, id), где меньший score
+означает лучшее совпадение, поэтому выдача листается курсором по этой
+паре так же, как лента — по (pub_date, id).
+"""
+import base64
+import binascii
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from . import stemmer
+from .models import Post
+from .paginator import KeysetPage
+
+
+class SearchBackend:
+    """Общий интерфейс; db — соединение, по умолчанию основное."""
+
+    def __init__(self, db=None):
+        self.db = db or connection
+
+
+class SQLiteSearch(SearchBackend):
+    """Инвертированный индекс на FTS5."""
+    table = 'posts_search'
+
+    def install(self, schema_editor):
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} '
+            "USING fts5(body, tokenize = 'unicode61 remove_diacritics 0')"
+        )
+
+    def uninstall(self, schema_editor):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {self.table}')
+
+    def index(self, post_id, text):
+        with self.db.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [post_id]
+            )
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, body) VALUES (%s, %s)',
+                [post_id, ' '.join(stemmer.tokens(text))],
+            )
+
+    def remove(self, post_id):
+        with self.db.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [post_id]
+            )
+
+    def rebuild(self, posts):
+        with self.db.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, body) VALUES (%s, %s)',
+                (
+                    (post_id, ' '.join(stemmer.tokens(text)))
+                    for post_id, text in posts
+                ),
+            )
+
+    def matches(self, query):
+        terms = stemmer.tokens(query)
+        if not terms:
+            return None
+        # Каждая основа в кавычках: пользовательский ввод не должен
+        # попадать в синтаксис запросов FTS5.
+        expression = ' '.join(f'"{term}"' for term in terms)
+        return (
+            f'SELECT rowid AS id, bm25({self.table}) AS score '
+            f'FROM {self.table} WHERE {self.table} MATCH %s',
+            [expression],
+        )
+
+
+class PostgresSearch(SearchBackend):
+    """tsvector с русским словарём; индекс обновляет сама база."""
+    index_name = 'posts_post_search_idx'
+
+    def install(self, schema_editor):
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {self.index_name} ON posts_post '
+            "USING GIN (to_tsvector('russian', text))"
+        )
+
+    def uninstall(self, schema_editor):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {self.index_name}')
+
+    def index(self, post_id, text):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self, posts):
+        pass
+
+    def matches(self, query):
+        if not stemmer.WORD_RE.search(query):
+            return None
+        return (
+            "SELECT id, -ts_rank(to_tsvector('russian', text), query)"
+            '::float8 AS score '
+            "FROM posts_post, plainto_tsquery('russian', %s) AS query "
+            "WHERE to_tsvector('russian', text) @@ query",
+            [query],
+        )
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearch,
+    'postgresql': PostgresSearch,
+}
+
+
+def get_backend(db=None):
+    """Бэкенд из POSTS_SEARCH_BACKEND или по типу базы."""
+    db = db or connection
+    if settings.POSTS_SEARCH_BACKEND:
+        return import_string(settings.POSTS_SEARCH_BACKEND)(db)
+    backend = BACKENDS.get(db.vendor)
+    return backend(db) if backend else None
+
+
+def index_post(post):
+    backend = get_backend()
+    if backend is not None:
+        backend.index(post.pk, post.text)
+
+
+def remove_post(post_id):
+    backend = get_backend()
+    if backend is not None:
+        backend.remove(post_id)
+
+
+def rebuild(batch_size=1000):
+    """Переиндексирует все посты."""
+    backend = get_backend()
+    if backend is None:
+        return
+    posts = Post.objects.values_list('pk', 'text').iterator(
+        chunk_size=batch_size
+    )
+    backend.rebuild(posts)
+
+
+def filter_matching(queryset, query):
+    """Посты queryset, подходящие под query, одним запросом с подзапросом
+    к индексу, или None, если индекс не помогает."""
+    backend = get_backend()
+    matches = backend.matches(query) if backend is not None else None
+    if matches is None:
+        return None
+    sql, params = matches
+    # Не RawSQL в pk__in: Django оборачивает его в лишние скобки, и для
+    # SQLite это уже скалярный подзапрос с одной строкой.
+    quote = backend.db.ops.quote_name
+    meta = queryset.model._meta
+    column = f'{quote(meta.db_table)}.{quote(meta.pk.column)}'
+    return queryset.extra(
+        where=[f'{column} IN (SELECT id FROM ({sql}) AS matches)'],
+        params=params,
+    )
+
+
+def encode_cursor(score, pk):
+    raw = f'{score!r}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        score, pk = raw.rsplit('|', 1)
+        return float(score), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class SearchPage(KeysetPage):
+    """Страница выдачи; курсор — пара (score, id) крайнего поста."""
+
+    def __init__(self, object_list, keys, has_next, has_previous):
+        super().__init__(object_list, None, has_next, has_previous)
+        self.keys = keys
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.keys:
+            return None
+        return encode_cursor(*self.keys[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.keys:
+            return None
+        return encode_cursor(*self.keys[0])
+
+
+def search_posts(query, per_page, after=None, before=None):
+    """Страница постов по запросу, от лучших совпадений к худшим."""
+    backend = get_backend()
+    matches = backend.matches(query) if backend is not None else None
+    if matches is None:
+        return SearchPage([], [], False, False)
+    sql, params = matches
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before) if after_key is None else None
+    where, order = '', 'ASC'
+    if after_key is not None:
+        where = 'WHERE (score, id) > (%s, %s)'
+        params = params + list(after_key)
+    elif before_key is not None:
+        where, order = 'WHERE (score, id) < (%s, %s)', 'DESC'
+        params = params + list(before_key)
+    with backend.db.cursor() as cursor:
+        cursor.execute(
+            f'SELECT score, id FROM ({sql}) AS matches {where} '
+            f'ORDER BY score {order}, id {order} LIMIT %s',
+            params + [per_page + 1],
+        )
+        rows = cursor.fetchall()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if before_key is not None:
+        rows.reverse()
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, after_key is not None
+    posts = Post.objects.for_feed().in_bulk([pk for _, pk in rows])
+    keys = [(score, pk) for score, pk in rows if pk in posts]
+    return SearchPage(
+        [posts[pk] for _, pk in keys], keys, has_next, has_previous
+    )
@@ -0,0 +1,109 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.tasks import run_in_background
+
+from . import (
+    feed_cache, recommendations, renditions, search, stats, thumbnails,
+    timeline, trending,
+)
+from .models import Comment, Follow, Post
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        stats.increment(instance.author_id, 'posts_count')
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    stats.decrement(instance.author_id, 'posts_count')
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, **kwargs):
+    instance._previous_group_id = None
+    instance._previous_image = None
+    if instance.pk:
+        previous = Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'image'
+        ).first()
+        if previous:
+            instance._previous_group_id, instance._previous_image = previous
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    names = feed_cache.post_feeds(instance)
+    if previous_group_id and previous_group_id != instance.group_id:
+        names.append(f'group:{previous_group_id}')
+    feed_cache.bump(*names)
+
+
+@receiver(post_save, sender=Post)
+def prepare_images(sender, instance, **kwargs):
+    thumbnails.pregenerate(instance.image)
+    previous = getattr(instance, '_previous_image', None) or ''
+    if (instance.image.name or '') != previous:
+        run_in_background(renditions.generate_by_id, instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        stats.increment(instance.author_id, 'followers_count')
+        stats.increment(instance.user_id, 'following_count')
+        timeline.backfill(instance.user_id, instance.author_id)
+        trending.on_follow(instance.author_id)
+        recommendations.on_follow_change(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_timeline(sender, instance, **kwargs):
+    # Состояние до уменьшения счётчика: при одновременных отписках
+    # счётчик может перескочить через порог больше чем на единицу.
+    was_exempt = timeline.is_fanout_exempt(instance.author_id)
+    stats.decrement(instance.author_id, 'followers_count')
+    stats.decrement(instance.user_id, 'following_count')
+    timeline.unfollow(instance.user_id, instance.author_id)
+    if was_exempt and not timeline.is_fanout_exempt(instance.author_id):
+        run_in_background(timeline.restore_fanout, instance.author_id)
+    recommendations.on_follow_change(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feed(sender, instance, **kwargs):
+    feed_cache.bump(f'follow:{instance.user_id}')
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        stats.increment(instance.author_id, 'comments_count')
+        trending.on_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    stats.decrement(instance.author_id, 'comments_count')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_post_comments(sender, instance, **kwargs):
+    feed_cache.bump(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Post)
+def update_search_index(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
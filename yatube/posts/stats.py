@@ -0,0 +1,92 @@
+"""Денормализованные счётчики постов, подписок и комментариев."""
+from django.db.models import Count, F
+
+from .models import AuthorStats, Comment, Follow, Post, User
+
+FIELDS = (
+    'posts_count', 'followers_count', 'following_count', 'comments_count'
+)
+
+
+def count_for(user_id):
+    """Точные значения счётчиков пользователя по исходным таблицам."""
+    return {
+        'posts_count': Post.objects.filter(author_id=user_id).count(),
+        'followers_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+        'comments_count': Comment.objects.filter(author_id=user_id).count(),
+    }
+
+
+def recount(user_id):
+    stats, _ = AuthorStats.objects.update_or_create(
+        user_id=user_id, defaults=count_for(user_id)
+    )
+    return stats
+
+
+def for_user(user):
+    """Счётчики пользователя; строка создаётся при первом обращении."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return recount(user.pk)
+
+
+def increment(user_id, field):
+    updated = AuthorStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + 1}
+    )
+    if not updated:
+        recount(user_id)
+
+
+def decrement(user_id, field):
+    # Строку без счётчиков не создаём: при каскадном удалении
+    # пользователя она бы сослалась на уже удалённую запись.
+    AuthorStats.objects.filter(user_id=user_id, **{f'{field}__gt': 0}).update(
+        **{field: F(field) - 1}
+    )
+
+
+def _grouped(queryset, key):
+    return dict(
+        queryset.values_list(key).annotate(total=Count('pk')).order_by()
+    )
+
+
+def rebuild(verify=False):
+    """Пересчитывает счётчики всех пользователей.
+
+    Возвращает список (user_id, поле, сохранено, на самом деле) для
+    расхождений. С verify=True только проверяет и ничего не пишет.
+    """
+    actual = {
+        'posts_count': _grouped(Post.objects.all(), 'author_id'),
+        'followers_count': _grouped(Follow.objects.all(), 'author_id'),
+        'following_count': _grouped(Follow.objects.all(), 'user_id'),
+        'comments_count': _grouped(Comment.objects.all(), 'author_id'),
+    }
+    stored = AuthorStats.objects.in_bulk()
+    mismatches = []
+    to_create, to_update = [], []
+    for user_id in User.objects.values_list('pk', flat=True).iterator():
+        stats = stored.get(user_id)
+        fresh = {field: actual[field].get(user_id, 0) for field in FIELDS}
+        if stats is None:
+            stats = AuthorStats(user_id=user_id)
+            to_create.append(stats)
+        elif all(getattr(stats, f) == fresh[f] for f in FIELDS):
+            continue
+        else:
+            to_update.append(stats)
+        for field in FIELDS:
+            if getattr(stats, field) != fresh[field]:
+                mismatches.append(
+                    (user_id, field, getattr(stats, field), fresh[field])
+                )
+                setattr(stats, field, fresh[field])
+    if not verify:
+        AuthorStats.objects.bulk_create(to_create, batch_size=500)
+        AuthorStats.objects.bulk_update(to_update, FIELDS, batch_size=500)
+    return mismatches
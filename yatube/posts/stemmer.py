@@ -0,0 +1,122 @@
+"""Стеммер Snowball для русского языка.
+
+Поиск по постам хранит в индексе основы слов, чтобы «котами» находилось
+по запросу «кот». Реализация следует описанию алгоритма на
+snowballstem.org; слова не из кириллицы только приводятся к нижнему
+регистру.
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'[а-я]+')
+
+
+def _endings(after_a=(), plain=()):
+    """Окончания вида (окончание, нужна ли перед ним «а» или «я»).
+
+    Самые длинные идут первыми: снимается самое длинное подходящее.
+    """
+    pairs = [(ending, True) for ending in after_a]
+    pairs += [(ending, False) for ending in plain]
+    return sorted(pairs, key=lambda pair: -len(pair[0]))
+
+
+PERFECTIVE_GERUND = _endings(
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = _endings(plain=(
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+))
+PARTICIPLE = _endings(
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = _endings(plain=('ся', 'сь'))
+VERB = _endings(
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = _endings(plain=(
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+))
+SUPERLATIVE = _endings(plain=('ейш', 'ейше'))
+DERIVATIONAL = ('ость', 'ост')
+
+
+def _regions(word):
+    """Начала областей RV и R2 в слове."""
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _remove(rv, endings):
+    for ending, after_a in endings:
+        if rv.endswith(ending):
+            stem = rv[:-len(ending)]
+            if after_a and not stem.endswith(('а', 'я')):
+                continue
+            return stem, True
+    return rv, False
+
+
+def stem(word):
+    """Основа слова."""
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC_RE.fullmatch(word):
+        return word
+    rv_start, r2_start = _regions(word)
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    rv, found = _remove(rv, PERFECTIVE_GERUND)
+    if not found:
+        rv, _ = _remove(rv, REFLEXIVE)
+        rv, found = _remove(rv, ADJECTIVE)
+        if found:
+            rv, _ = _remove(rv, PARTICIPLE)
+        else:
+            rv, found = _remove(rv, VERB)
+            if not found:
+                rv, _ = _remove(rv, NOUN)
+
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    r2_offset = r2_start - rv_start
+    for ending in DERIVATIONAL:
+        if rv.endswith(ending) and len(rv) - len(ending) >= r2_offset:
+            rv = rv[:-len(ending)]
+            break
+
+    rv, found = _remove(rv, SUPERLATIVE)
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif not found and rv.endswith('ь'):
+        rv = rv[:-1]
+    return prefix + rv
+
+
+def tokens(text):
+    """Основы всех слов текста по порядку."""
+    return [stem(word) for word in WORD_RE.findall(text)]
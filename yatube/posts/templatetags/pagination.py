@@ -0,0 +1,16 @@
+from django import template
+
+from ..paginator import ELLIPSIS, elided_page_range
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_range(page_obj, on_each_side=2, on_ends=1):
+    """Номера страниц для навигации; пропуски — ELLIPSIS."""
+    return list(elided_page_range(page_obj, on_each_side, on_ends))
+
+
+@register.filter
+def is_ellipsis(value):
+    return value == ELLIPSIS
@@ -0,0 +1,11 @@
+from django import template
+
+from .. import renditions
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/post_picture.html')
+def post_picture(post):
+    """<picture> с srcset по готовым копиям картинки поста."""
+    return {'picture': renditions.picture(post.renditions.all())}
@@ -0,0 +1,42 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from .. import benchmark
+from ..models import Follow, Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
+
+    def test_every_route_is_measured(self):
+        """Все именованные маршруты posts и users попадают в отчёт."""
+        dataset = benchmark.seed(
+            users=4, groups=2, posts=12, images=1, comments=5, follows=2
+        )
+        self.assertEqual(Post.objects.count(), 12)
+        self.assertEqual(Follow.objects.count(), 8)
+        results = benchmark.run(dataset, iterations=2, warmup=0)
+        names = {item['name'] for item in results}
+        self.assertIn('posts:index', names)
+        self.assertIn('users:password_reset_confirm', names)
+        self.assertEqual(len(names), len(benchmark.routes(dataset['kwargs'])))
+        for item in results:
+            with self.subTest(route=item['name']):
+                self.assertNotIn('error', item)
+                self.assertLessEqual(item['p50_ms'], item['p99_ms'])
+                self.assertGreater(item['queries'], 0)
@@ -0,0 +1,139 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class IndexCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='cached')
+        cls.post = Post.objects.create(author=cls.user, text='Первый пост')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_page_ids_are_cached(self):
+        """Повторный запрос главной не пересчитывает страницу."""
+        self.guest_client.get(reverse('posts:index'))
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(reverse('posts:index'))
+        self.assertNotIn('COUNT', ' '.join(
+            query['sql'] for query in queries.captured_queries
+        ))
+
+    def test_new_post_invalidates_feeds(self):
+        """Новый пост сразу виден на главной, в группе и в подписках."""
+        group = Group.objects.create(title='Группа', slug='gen-group')
+        reader = User.objects.create_user(username='gen-reader')
+        Follow.objects.create(user=reader, author=self.user)
+        self.authorized_client.force_login(reader)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            self.authorized_client.get(url)
+        new_post = Post.objects.create(
+            author=self.user, text='Второй пост', group=group
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertIn(new_post, response.context['page_obj'])
+
+    def test_moved_post_leaves_old_group(self):
+        """Пост, перенесённый в другую группу, пропадает из старой."""
+        old = Group.objects.create(title='Старая', slug='old-group')
+        new = Group.objects.create(title='Новая', slug='new-group')
+        post = Post.objects.create(author=self.user, text='Пост', group=old)
+        url = reverse('posts:group_list', kwargs={'slug': old.slug})
+        self.guest_client.get(url)
+        post.group = new
+        post.save()
+        response = self.guest_client.get(url)
+        self.assertNotIn(post, response.context['page_obj'])
+
+    def test_deleted_post_leaves_cached_page(self):
+        """Удалённый пост пропадает, даже если его id лежит в кэше."""
+        extra = Post.objects.create(author=self.user, text='Удалю')
+        self.guest_client.get(reverse('posts:index'))
+        extra.delete()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+    def test_user_specific_html_is_not_shared(self):
+        """Гость не получает шапку авторизованного пользователя."""
+        self.authorized_client.get(reverse('posts:index'))
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotContains(response, reverse('posts:follow_index'))
+        self.assertContains(response, self.post.text)
+
+    def test_stale_page_served_during_rebuild(self):
+        """Пока ленту пересобирает другой запрос, отдаётся прежняя."""
+        self.guest_client.get(reverse('posts:index'))
+        cache.add('feed:index::::lock', 1)
+        new_post = Post.objects.create(author=self.user, text='Пока нет')
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotIn(new_post, response.context['page_obj'])
+        cache.delete('feed:index::::lock')
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertIn(new_post, response.context['page_obj'])
+
+    def test_edited_post_card_is_rendered_again(self):
+        """Карточка отредактированного поста не берётся из кэша."""
+        self.guest_client.get(reverse('posts:index'))
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный текст'
+        post.save()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Исправленный текст')
+
+
+class PostDetailCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='detail-cached')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.url = reverse('posts:post_detail', kwargs={'post_id': cls.post.pk})
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def test_payload_is_cached(self):
+        """Повторный запрос страницы поста не читает посты из базы."""
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(len(queries.captured_queries), 0)
+        self.assertEqual(response.context['post'], self.post)
+
+    def test_new_comment_is_shown(self):
+        self.client.get(self.url)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Новый комментарий'
+        )
+        self.assertContains(self.client.get(self.url), 'Новый комментарий')
+
+    def test_stale_copy_served_during_rebuild(self):
+        """Пока страницу пересобирает другой воркер, отдаётся старая."""
+        self.client.get(self.url)
+        cache.add(f'post_detail:{self.post.pk}:lock', 1)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Пока не виден'
+        )
+        self.assertNotContains(self.client.get(self.url), 'Пока не виден')
@@ -1,7 +1,11 @@
+import re
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from ..models import Comment, Post
@@ -24,6 +28,7 @@ class CommentTest(TestCase):
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
+        cache.clear()
 
     def test_post_adding_an_unauthorized_guest_comment(self):
         """При добавлении комментария от
@@ -70,3 +75,67 @@ class CommentTest(TestCase):
             'posts:post_detail',
             kwargs={'post_id': self.post.pk}))
         self.assertEqual(response_three.context['comments'][0], last_comment)
+
+
+@override_settings(POSTS_COMMENTS_PER_PAGE=3)
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='commentator')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {i}'
+            )
+            for i in range(7)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_renders_first_page_only(self):
+        """На странице поста только первые комментарии, новые сверху."""
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        comments = response.context['comments']
+        self.assertEqual(list(comments), self.comments[::-1][:3])
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, 'comments_after=')
+
+    def test_next_page_reads_comments_once(self):
+        """Следующая страница не читает заодно и первую."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        after = self.client.get(url).context['comments'].next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'comments_after': after})
+        self.assertEqual(
+            list(response.context['comments']), self.comments[::-1][3:6]
+        )
+        comment_queries = [
+            query for query in queries.captured_queries
+            if 'FROM "posts_comment"' in query['sql']
+        ]
+        self.assertEqual(len(comment_queries), 1)
+
+    def test_json_endpoint_continues_from_cursor(self):
+        """posts:post_comments отдаёт следующие страницы без повторов."""
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        first = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        ).context['comments']
+        texts = [comment.text for comment in first]
+        after = first.next_cursor
+        while after:
+            data = self.client.get(url, {'after': after}).json()
+            texts += re.findall(r'Комментарий \d+', data['html'])
+            after = data['next']
+        self.assertEqual(
+            texts, [comment.text for comment in self.comments[::-1]]
+        )
+
+    def test_json_endpoint_unknown_post(self):
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 10 ** 6})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -0,0 +1,169 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import counts
+from ..models import Group, Post
+from ..paginator import (
+    ELLIPSIS, decode_cursor, elided_page_range, encode_cursor,
+)
+
+User = get_user_model()
+
+
+@override_settings(POSTS_KEYSET_PAGINATION=True)
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='keyset')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='keyset-group',
+            description='Описание',
+        )
+        Post.objects.bulk_create([
+            Post(text=f'Пост {i}', author=cls.author, group=cls.group)
+            for i in range(13)
+        ])
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def test_cursor_round_trip(self):
+        """Токен курсора декодируется обратно в (pub_date, id)."""
+        post = Post.objects.first()
+        self.assertEqual(
+            decode_cursor(encode_cursor(post)), (post.pub_date, post.pk)
+        )
+        self.assertIsNone(decode_cursor('мусор'))
+
+    def test_pages_follow_each_other(self):
+        """Страницы по курсору не пересекаются и покрывают всю ленту."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.client.get(url).context['page_obj']
+                self.assertEqual(len(first), 10)
+                self.assertFalse(first.has_previous())
+                second = self.client.get(
+                    url, {'after': first.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second), 3)
+                self.assertFalse(second.has_next())
+                back = self.client.get(
+                    url, {'before': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+
+    def test_new_posts_do_not_shift_cursor(self):
+        """Новый пост не сдвигает уже открытую страницу."""
+        url = reverse('posts:index')
+        first = self.client.get(url).context['page_obj']
+        Post.objects.create(text='Свежий пост', author=self.author)
+        second = self.client.get(
+            url, {'after': first.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second), 3)
+        self.assertNotIn(first[-1], second)
+
+
+class ApproximateCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='counted')
+        Post.objects.bulk_create([
+            Post(text=f'Пост {i}', author=cls.author) for i in range(25)
+        ])
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def test_elided_page_range_is_bounded(self):
+        """Ссылок на страницы не больше окна, сколько бы их ни было."""
+        paginator = Paginator(range(10_000), 1)
+        pages = list(elided_page_range(paginator.page(5000)))
+        self.assertEqual(
+            pages,
+            [1, ELLIPSIS, 4998, 4999, 5000, 5001, 5002, ELLIPSIS, 10_000],
+        )
+        self.assertEqual(
+            list(elided_page_range(paginator.page(1))),
+            [1, 2, 3, ELLIPSIS, 10_000],
+        )
+        self.assertEqual(
+            list(elided_page_range(Paginator(range(5), 1).page(3))),
+            [1, 2, 3, 4, 5],
+        )
+
+    def test_ellipsis_hides_more_than_one_page(self):
+        """Вместо одной пропущенной страницы выводится её номер."""
+        paginator = Paginator(range(20), 1)
+        self.assertEqual(
+            list(elided_page_range(paginator.page(5))),
+            [1, 2, 3, 4, 5, 6, 7, ELLIPSIS, 20],
+        )
+        self.assertEqual(
+            list(elided_page_range(paginator.page(16))),
+            [1, ELLIPSIS, 14, 15, 16, 17, 18, 19, 20],
+        )
+
+    def test_small_feed_is_counted_exactly(self):
+        self.assertEqual(counts.feed_count('index', Post.objects.all()), 25)
+
+    @override_settings(
+        POSTS_EXACT_COUNT_LIMIT=10, BACKGROUND_WORKERS=0
+    )
+    def test_large_feed_uses_cached_count(self):
+        """Большая лента считается в фоне, а до того — по оценке."""
+        queryset = Post.objects.filter(author=self.author)
+        cache.set('count-lock:big', 1)
+        self.assertEqual(counts.feed_count('big', queryset), 11)
+        cache.delete('count-lock:big')
+        # Без блокировки пересчёт (при 0 воркеров — сразу) кладёт точное
+        # число в кэш, и дальше оно берётся оттуда.
+        self.assertEqual(counts.feed_count('big', queryset), 25)
+        with self.assertNumQueries(1):
+            self.assertEqual(counts.feed_count('big', queryset), 25)
+
+    def test_table_estimate_reads_planner_statistics(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(counts.table_estimate(Post.objects.all()), 25)
+
+    def test_table_estimate_parses_float_statistics(self):
+        """reltuples в PostgreSQL — float, -1 — таблица не анализирована."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        for stat, expected in (('12345.0', 12345), ('-1', None)):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'UPDATE sqlite_stat1 SET stat = %s WHERE tbl = %s',
+                    [stat, Post._meta.db_table],
+                )
+            self.assertEqual(
+                counts.table_estimate(Post.objects.all()), expected
+            )
+
+    @override_settings(
+        POSTS_EXACT_COUNT_LIMIT=10, BACKGROUND_WORKERS=0
+    )
+    def test_index_paginator_is_elided(self):
+        Post.objects.bulk_create([
+            Post(text=f'Ещё пост {i}', author=self.author)
+            for i in range(200)
+        ])
+        response = self.client.get(reverse('posts:index'), {'page': 10})
+        self.assertContains(response, ELLIPSIS)
+        self.assertLess(response.content.decode().count('page-item'), 15)
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class FeedQueryBudgetTests(QueryBudgetMixin, TestCase):
+    repeat_limit = 1
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='budget-group',
+            description='Описание',
+        )
+        cls.author = User.objects.create_user(
+            username='budget', first_name='Лев', last_name='Толстой'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(12):
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+        cls.post = Post.objects.first()
+        for i in range(30):
+            commentator = User.objects.create_user(username=f'user{i}')
+            Comment.objects.create(
+                post=cls.post, author=commentator, text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+        cache.clear()
+
+    def test_feed_pages_fit_query_budget(self):
+        """Число запросов ленты не зависит от количества постов."""
+        budgets = {
+            reverse('posts:index'): 5,
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}): 6,
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}): 6,
+            reverse('posts:follow_index'): 7,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                self.assertQueryBudget(self.client, url, budget)
+
+    def test_post_detail_comments_fit_query_budget(self):
+        """Авторы комментариев читаются одним запросом с комментариями."""
+        for url in (
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+        ):
+            with self.subTest(url=url):
+                self.assertQueryBudget(self.client, url, 8)
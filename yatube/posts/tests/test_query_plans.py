@@ -0,0 +1,107 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..paginator import encode_cursor
+
+User = get_user_model()
+
+# «SCAN таблица» без индекса — полный проход по таблице. SCAN по индексу
+# (например, ORDER BY pub_date с LIMIT) и поиск SEARCH допустимы.
+FULL_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)$')
+
+# Таблицы, которые читаются целиком намеренно: список групп для формы
+# и подзапрос с LIMIT, по которому counts.feed_count считает посты.
+ALLOWED_SCANS = {
+    'posts_group',
+    'subquery',
+}
+
+
+def full_scans(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        details = [row[-1] for row in cursor.fetchall()]
+    scans = []
+    for detail in details:
+        match = FULL_SCAN_RE.match(detail)
+        if match and match.group(1) not in ALLOWED_SCANS:
+            scans.append(detail)
+    return scans
+
+
+class QueryPlanTests(TestCase):
+    """Каждый запрос страниц ленты должен идти по индексу."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост про кота {i}'
+            )
+            for i in range(15)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def assertNoFullScans(self, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            with self.subTest(url=url, sql=sql):
+                self.assertEqual(full_scans(sql), [])
+
+    def test_full_scan_is_detected(self):
+        self.assertEqual(
+            full_scans('SELECT id FROM posts_post WHERE text = 1'),
+            ['SCAN posts_post'],
+        )
+
+    def test_feeds(self):
+        post = self.posts[0]
+        urls = {
+            reverse('posts:index'): None,
+            reverse('posts:popular'): None,
+            reverse('posts:group_list', args=[self.group.slug]): None,
+            reverse('posts:profile', args=[self.author.username]): None,
+            reverse('posts:follow_index'): None,
+            reverse('posts:post_detail', args=[post.pk]): None,
+            reverse('posts:post_search'): {'q': 'кот'},
+        }
+        for url, data in urls.items():
+            self.assertNoFullScans(url, data)
+        self.client.force_login(self.author)
+        self.assertNoFullScans(reverse('posts:post_edit', args=[post.pk]))
+
+    def test_second_pages(self):
+        cursor = encode_cursor(self.posts[5])
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+        ):
+            self.assertNoFullScans(url, {'page': 2})
+            self.assertNoFullScans(url, {'after': cursor})
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import benchmark, recommendations
+from ..models import Follow, FollowCandidate
+
+User = get_user_model()
+
+GRAPH = {
+    'alice': ('bob', 'carol'),
+    'bob': ('dave',),
+    'carol': ('dave', 'erin'),
+    'frank': ('bob', 'carol', 'gina'),
+}
+
+
+@override_settings(BACKGROUND_WORKERS=0)
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        names = set(GRAPH) | {name for row in GRAPH.values() for name in row}
+        cls.users = {
+            name: User.objects.create_user(username=name)
+            for name in sorted(names)
+        }
+        for name, authors in GRAPH.items():
+            for author in authors:
+                Follow.objects.create(
+                    user=cls.users[name], author=cls.users[author]
+                )
+
+    def candidates(self, name):
+        return [
+            row.candidate.username
+            for row in recommendations.for_user(self.users[name])
+        ]
+
+    def test_friends_of_friends_and_similar_readers(self):
+        """Сначала друзья друзей, потом подписки похожих читателей."""
+        recommendations.rebuild(backend='python')
+        self.assertEqual(self.candidates('alice'), ['dave', 'erin', 'gina'])
+
+    def test_incremental_refresh_matches_rebuild(self):
+        Follow.objects.create(
+            user=self.users['alice'], author=self.users['dave']
+        )
+        Follow.objects.filter(
+            user=self.users['frank'], author=self.users['bob']
+        ).delete()
+        incremental = set(FollowCandidate.objects.filter(
+            user__in=[self.users['alice'], self.users['frank']]
+        ).values_list('user_id', 'candidate_id'))
+        recommendations.rebuild(backend='python')
+        rebuilt = set(FollowCandidate.objects.filter(
+            user__in=[self.users['alice'], self.users['frank']]
+        ).values_list('user_id', 'candidate_id'))
+        self.assertEqual(incremental, rebuilt)
+        self.assertNotIn('dave', self.candidates('alice'))
+
+    def test_sparse_backend_matches_python(self):
+        edges = benchmark.follow_graph(200, 2000)
+        python = dict(recommendations.score(edges, backend='python'))
+        for user_id, found in recommendations.score(edges, backend='sparse'):
+            expected = python[user_id]
+            self.assertEqual(len(found), len(expected))
+            for (_, score), (_, value) in zip(found, expected):
+                self.assertAlmostEqual(score, value)
+
+    def test_suggestions_page(self):
+        recommendations.rebuild(backend='python')
+        client = Client()
+        client.force_login(self.users['alice'])
+        response = client.get(reverse('posts:follow_suggestions'))
+        self.assertContains(
+            response, reverse('posts:profile_follow', args=['dave'])
+        )
+
+    def test_benchmark(self):
+        report = benchmark.recommendations(50, 300, 5, ['python'])
+        self.assertEqual(report['edges'], 300)
+        self.assertGreater(report['python']['candidates'], 0)
@@ -0,0 +1,62 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import renditions
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_png(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'teal').save(buffer, 'PNG')
+    return SimpleUploadedFile(
+        'photo.png', buffer.getvalue(), content_type='image/png'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class RenditionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='photographer')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user, text='Фото', image=make_png(700, 500)
+        )
+
+    def test_widths_up_to_source_are_generated(self):
+        """Копии не шире оригинала и в пропорциях карточки."""
+        renditions.generate(self.post)
+        sizes = set(self.post.renditions.values_list('width', 'height'))
+        self.assertEqual(sizes, {(320, 113), (640, 226)})
+        formats = set(self.post.renditions.values_list('format', flat=True))
+        self.assertEqual(formats, set(renditions.available_formats()))
+        self.assertIn('JPEG', formats)
+
+    def test_feed_renders_srcset(self):
+        """Лента выводит <picture> с srcset и размерами."""
+        renditions.generate(self.post)
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, 'width="640" height="226"')
+        self.assertContains(response, '640w')
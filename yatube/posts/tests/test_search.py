@@ -0,0 +1,98 @@
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..admin import PostAdmin
+from ..models import Post
+from ..stemmer import stem
+
+User = get_user_model()
+
+
+class StemmerTests(TestCase):
+    def test_word_forms_share_stem(self):
+        for forms in (
+            ('кот', 'коты', 'котами'),
+            ('книга', 'книгами', 'книгу'),
+            ('красивая', 'красивый', 'красивые'),
+        ):
+            with self.subTest(forms=forms):
+                self.assertEqual(len({stem(word) for word in forms}), 1)
+
+    def test_latin_words_are_lowercased(self):
+        self.assertEqual(stem('Django'), 'django')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='writer')
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Коты и кошки: кот кот кот'
+        )
+        cls.one_cat = Post.objects.create(
+            author=cls.user,
+            text='Сегодня гуляли в парке, видели котов и много голубей',
+        )
+        cls.dogs = Post.objects.create(author=cls.user, text='Про собак')
+
+    def ids(self, query, **kwargs):
+        return [post.pk for post in search.search_posts(query, 10, **kwargs)]
+
+    def test_finds_other_word_forms_ranked(self):
+        """Находит по другой форме слова, частые совпадения выше."""
+        self.assertEqual(self.ids('котами'), [self.cats.pk, self.one_cat.pk])
+
+    def test_all_terms_required(self):
+        self.assertEqual(self.ids('коты парк'), [self.one_cat.pk])
+
+    def test_fts_syntax_is_not_interpreted(self):
+        self.assertEqual(self.ids('"кот*" ^:('), [
+            self.cats.pk, self.one_cat.pk,
+        ])
+        self.assertEqual(self.ids('!!!'), [])
+
+    def test_admin_search_is_one_query(self):
+        """Поиск в админке — подзапрос к индексу, а не список id."""
+        model_admin = PostAdmin(Post, admin.site)
+        with self.assertNumQueries(0):
+            queryset, _ = model_admin.get_search_results(
+                None, Post.objects.all(), 'котами'
+            )
+        with self.assertNumQueries(1):
+            self.assertEqual(set(queryset), {self.cats, self.one_cat})
+
+    def test_index_follows_edit_and_delete(self):
+        self.dogs.text = 'Теперь про котов'
+        self.dogs.save()
+        self.assertIn(self.dogs.pk, self.ids('кот'))
+        self.assertEqual(self.ids('собака'), [])
+        self.cats.delete()
+        self.assertNotIn(self.cats.pk, self.ids('кот'))
+
+    def test_keyset_pages(self):
+        posts = [
+            Post.objects.create(author=self.user, text=f'Кот номер {i}')
+            for i in range(5)
+        ]
+        expected = self.ids('кот')
+        self.assertEqual(len(expected), len(posts) + 2)
+        first = search.search_posts('кот', 3)
+        second = search.search_posts('кот', 3, after=first.next_cursor)
+        third = search.search_posts('кот', 3, after=second.next_cursor)
+        pages = [first, second, third]
+        self.assertEqual(
+            [post.pk for page in pages for post in page], expected
+        )
+        self.assertFalse(third.has_next())
+        back = search.search_posts('кот', 3, before=second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+
+    def test_search_page(self):
+        response = Client().get(
+            reverse('posts:post_search'), {'q': 'голуби'}
+        )
+        self.assertEqual(list(response.context['page_obj']), [self.one_cat])
+        self.assertContains(response, 'Сегодня гуляли в парке')
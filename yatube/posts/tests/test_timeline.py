@@ -0,0 +1,110 @@
+from importlib import import_module
+from types import SimpleNamespace
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import F
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import stats, timeline
+from ..models import AuthorStats, Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.old_post = Post.objects.create(
+            author=cls.author, text='Пост до подписки'
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        """Подписка добавляет старые посты, новые раскладываются сразу."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(
+            set(self.reader.timeline.values_list('post_id', flat=True)),
+            {self.old_post.pk, new_post.pk},
+        )
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [new_post, self.old_post])
+
+    def test_unfollow_clears_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        follow.delete()
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader).exists())
+
+    @override_settings(POSTS_FANOUT_FOLLOWER_LIMIT=1)
+    def test_popular_author_is_read_on_demand(self):
+        """Посты популярного автора не раскладываются, но видны в ленте."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Для всех')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(
+            list(timeline.follow_feed(self.reader)),
+            [new_post, self.old_post],
+        )
+
+    @override_settings(
+        POSTS_FANOUT_FOLLOWER_LIMIT=2, BACKGROUND_WORKERS=0
+    )
+    def test_author_back_below_limit_keeps_posts(self):
+        """Посты, опубликованные выше порога, не пропадают после отписки."""
+        other = User.objects.create_user(username='other-reader')
+        Follow.objects.create(user=self.reader, author=self.author)
+        follow = Follow.objects.create(user=other, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Для всех')
+        follow.delete()
+        self.assertEqual(
+            list(timeline.follow_feed(self.reader)),
+            [new_post, self.old_post],
+        )
+
+    @override_settings(
+        POSTS_FANOUT_FOLLOWER_LIMIT=2, BACKGROUND_WORKERS=0
+    )
+    def test_counter_jumping_past_limit_restores_fanout(self):
+        """Раскладка восстанавливается, даже если параллельная отписка
+        уменьшила счётчик ещё раз и он перескочил LIMIT - 1."""
+        other = User.objects.create_user(username='racing-reader')
+        Follow.objects.create(user=self.reader, author=self.author)
+        follow = Follow.objects.create(user=other, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Для всех')
+
+        def racing(user_id, field):
+            step = 2 if field == 'followers_count' else 1
+            AuthorStats.objects.filter(user_id=user_id).update(
+                **{field: F(field) - step}
+            )
+
+        with mock.patch.object(stats, 'decrement', side_effect=racing):
+            follow.delete()
+        self.assertEqual(
+            set(self.reader.timeline.values_list('post_id', flat=True)),
+            {new_post.pk, self.old_post.pk},
+        )
+
+    def test_migration_fills_existing_follows(self):
+        """Миграция раскладывает посты по подпискам, сделанным до неё."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        migration = import_module('posts.migrations.0011_fill_timelines')
+        migration.fill_timelines(apps, SimpleNamespace(connection=connection))
+        self.assertEqual(
+            list(self.reader.timeline.values_list('post_id', flat=True)),
+            [self.old_post.pk],
+        )
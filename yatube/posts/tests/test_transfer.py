@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import search
+from ..models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.group = Group.objects.create(
+            title='Группа', slug='dump', description='Описание'
+        )
+        self.posts = [
+            Post.objects.create(
+                author=self.author, group=self.group,
+                text=f'Пост {i}\nвторая строка, с "кавычками"',
+            )
+            for i in range(5)
+        ]
+        old = timezone.now() - timedelta(days=30)
+        Post.objects.filter(pk=self.posts[0].pk).update(pub_date=old)
+        self.posts[0].refresh_from_db()
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def dump(self, fmt):
+        paths = {}
+        for name in ('groups', 'posts', 'comments', 'follows'):
+            paths[name] = os.path.join(self.directory, f'{name}.{fmt}')
+            call_command('export_data', name, paths[name], stderr=StringIO())
+        return paths
+
+    def load(self, paths, **options):
+        for name, path in paths.items():
+            call_command(
+                'import_data', name, path, stdout=StringIO(),
+                stderr=StringIO(), **options
+            )
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка сохраняют записи, ключи и даты."""
+        for fmt in ('ndjson', 'csv'):
+            with self.subTest(fmt=fmt):
+                paths = self.dump(fmt)
+                Group.objects.all().delete()
+                Post.objects.all().delete()
+                Follow.objects.all().delete()
+                self.load(paths, batch_size=2)
+                post = Post.objects.get(pk=self.posts[0].pk)
+                self.assertEqual(post.text, self.posts[0].text)
+                self.assertEqual(post.pub_date, self.posts[0].pub_date)
+                self.assertEqual(post.group, self.group)
+                self.assertEqual(Post.objects.count(), 5)
+                self.assertEqual(post.comments.count(), 1)
+                self.assertTrue(Follow.objects.filter(
+                    user=self.reader, author=self.author
+                ).exists())
+
+    def test_import_rebuilds_derived_data(self):
+        """bulk_create без сигналов: счётчики и поиск пересобираются."""
+        paths = self.dump('ndjson')
+        Post.objects.all().delete()
+        self.load({'posts': paths['posts'], 'comments': paths['comments']})
+        author_stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual(author_stats.posts_count, 5)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).comments_count, 1
+        )
+        if search.get_backend() is not None:
+            matches = search.filter_matching(Post.objects.all(), 'кавычки')
+            self.assertEqual(matches.count(), 5)
+
+    def test_reimport_is_idempotent_and_skips_dangling(self):
+        """Повторная загрузка ничего не дублирует, а записи со ссылками
+        на отсутствующие строки пропускаются."""
+        paths = self.dump('csv')
+        Post.objects.filter(pk=self.posts[0].pk).delete()
+        out = StringIO()
+        call_command(
+            'import_data', 'comments', paths['comments'], stdout=out,
+            stderr=StringIO(),
+        )
+        self.assertIn('пропущено без связанных записей 1', out.getvalue())
+        self.load({'posts': paths['posts']})
+        self.load({'posts': paths['posts']})
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_resume_continues_from_checkpoint(self):
+        """--resume читает файл со смещения последней пачки."""
+        path = self.dump('ndjson')['posts']
+        with open(path, 'rb') as raw:
+            first_line = raw.readline()
+        with open(f'{path}.offset', 'w') as stream:
+            stream.write(str(len(first_line)))
+        Post.objects.all().delete()
+        self.load({'posts': path}, resume=True)
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertFalse(os.path.exists(f'{path}.offset'))
+
+    def test_unknown_columns_are_rejected(self):
+        path = os.path.join(self.directory, 'posts.ndjson')
+        with open(path, 'w') as stream:
+            stream.write('{"id": 1, "password": "x"}\n')
+        with self.assertRaises(CommandError):
+            self.load({'posts': path})
@@ -0,0 +1,97 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import trending
+from ..models import Comment, Follow, Post, PostScore
+
+User = get_user_model()
+
+
+@override_settings(POSTS_TRENDING_HALF_LIFE=3600)
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='trending')
+        cls.reader = User.objects.create_user(username='trend-reader')
+        cls.quiet = Post.objects.create(text='Тихий пост', author=cls.author)
+        cls.busy = Post.objects.create(
+            text='Обсуждаемый пост', author=cls.author
+        )
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def comment(self, post, count=1):
+        for _ in range(count):
+            Comment.objects.create(post=post, author=self.reader, text='Да')
+
+    def test_comments_rank_posts(self):
+        """Пост с большим числом комментариев выше в популярном."""
+        self.comment(self.quiet)
+        self.comment(self.busy, 3)
+        self.assertEqual(trending.top_ids(), [self.busy.pk, self.quiet.pk])
+        response = self.client.get(reverse('posts:popular'))
+        self.assertEqual(
+            list(response.context['page_obj']), [self.busy, self.quiet]
+        )
+
+    def test_activity_decays(self):
+        """Вклад события убывает вдвое за период полураспада."""
+        now = timezone.now()
+        trending.add_activity([self.busy.pk], 4, now - timedelta(hours=2))
+        trending.add_activity([self.quiet.pk], 2, now)
+        busy = PostScore.objects.get(post=self.busy).score
+        self.assertAlmostEqual(trending.current(busy, now), 1.0)
+        self.assertEqual(trending.top_ids(), [self.quiet.pk, self.busy.pk])
+
+    def test_events_add_up_in_database(self):
+        """Два события одного веса в один момент — удвоенный рейтинг."""
+        now = timezone.now()
+        trending.add_activity([self.busy.pk], 1, now)
+        trending.add_activity([self.busy.pk], 1, now)
+        score = PostScore.objects.get(post=self.busy).score
+        self.assertAlmostEqual(trending.current(score, now), 2.0)
+
+    def test_scoring_failure_keeps_comment(self):
+        """Ошибка рейтинга не мешает сохранить комментарий."""
+        locked = OperationalError('database is locked')
+        with mock.patch.object(trending, 'add_activity', side_effect=locked):
+            with self.assertLogs('posts.trending', 'ERROR'):
+                self.comment(self.busy)
+        self.assertTrue(Comment.objects.filter(post=self.busy).exists())
+
+    def test_follow_boosts_latest_posts(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            set(trending.top_ids()), {self.quiet.pk, self.busy.pk}
+        )
+
+    def test_compaction_drops_faded_posts(self):
+        now = timezone.now()
+        trending.add_activity([self.quiet.pk], 1, now - timedelta(days=1))
+        self.comment(self.busy)
+        out = StringIO()
+        call_command('compact_trending', stdout=out)
+        self.assertIn('Удалено строк: 1', out.getvalue())
+        self.assertEqual(trending.top_ids(), [self.busy.pk])
+
+    def test_rebuild_matches_incremental_scores(self):
+        self.comment(self.quiet)
+        self.comment(self.busy, 2)
+        incremental = dict(PostScore.objects.values_list('post_id', 'score'))
+        trending.rebuild()
+        rebuilt = dict(PostScore.objects.values_list('post_id', 'score'))
+        self.assertEqual(incremental.keys(), rebuilt.keys())
+        for post_id, score in rebuilt.items():
+            self.assertAlmostEqual(score, incremental[post_id])
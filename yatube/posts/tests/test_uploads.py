@@ -0,0 +1,121 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(width, height, with_exif=False, fmt='JPEG'):
+    image = Image.new('RGB', (width, height), 'orange')
+    options = {}
+    if with_exif:
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera maker'
+        options['exif'] = exif.tobytes()
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return SimpleUploadedFile(
+        f'photo.{fmt.lower()}', buffer.getvalue(),
+        content_type=f'image/{fmt.lower()}',
+    )
+
+
+def make_jpeg(width, height, with_exif=False):
+    return make_image(width, height, with_exif)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_WORKERS=0)
+class UploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='uploader')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create(self, image):
+        return self.client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост с фото', 'image': image},
+        )
+
+    @override_settings(POSTS_IMAGE_MAX_UPLOAD_SIZE=1024)
+    def test_oversized_upload_is_rejected(self):
+        """Файл больше лимита отбрасывается, пост не создаётся."""
+        response = self.create(
+            SimpleUploadedFile('big.jpg', b'\xff' * 4096)
+        )
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка больше 1,0\xa0КБ.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POSTS_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_is_rejected(self):
+        """Разрешение проверяется по заголовку картинки."""
+        response = self.create(make_jpeg(20, 20))
+        self.assertFormError(
+            response, 'form', 'image', 'Слишком большое разрешение картинки.'
+        )
+
+    @override_settings(POSTS_IMAGE_MAX_DECODED_PIXELS=100)
+    def test_png_has_tighter_pixel_limit(self):
+        """PNG декодируется целиком, поэтому его лимит строже."""
+        response = self.create(make_image(20, 20, fmt='PNG'))
+        self.assertFormError(
+            response, 'form', 'image', 'Слишком большое разрешение картинки.'
+        )
+        self.create(make_jpeg(20, 20))
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_not_an_image_is_rejected(self):
+        response = self.create(
+            SimpleUploadedFile('fake.jpg', b'not an image')
+        )
+        self.assertEqual(len(response.context['form'].errors['image']), 1)
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POSTS_IMAGE_MAX_DIMENSION=100)
+    def test_huge_image_is_downsized_without_exif(self):
+        """Большая картинка уменьшается, EXIF вырезается."""
+        self.create(make_jpeg(400, 200, with_exif=True))
+        post = Post.objects.get()
+        with post.image.open('rb') as stored:
+            image = Image.open(stored)
+            self.assertEqual(image.size, (100, 50))
+            self.assertFalse(image.getexif())
+
+    def test_png_exif_is_removed(self):
+        """EXIF из PNG не переживает перекодирование."""
+        self.create(make_image(50, 50, with_exif=True, fmt='PNG'))
+        post = Post.objects.get()
+        with post.image.open('rb') as stored:
+            image = Image.open(stored)
+            self.assertEqual(image.format, 'PNG')
+            self.assertNotIn('exif', image.info)
+            self.assertFalse(image.getexif())
+
+    def test_small_image_is_stored_as_is(self):
+        upload = make_jpeg(50, 50)
+        self.create(upload)
+        post = Post.objects.get()
+        with post.image.open('rb') as stored:
+            self.assertEqual(stored.read(), upload.file.getvalue())
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.querycheck import QueryTracker
+
+
+class QueryBudgetMixin:
+    """Проверка, что страница укладывается в заданное число SQL-запросов.
+
+    repeat_limit — сколько раз может выполниться запрос одной формы;
+    больше означает N+1, и в сообщении будет строка шаблона.
+    """
+    repeat_limit = None
+
+    def assertQueryBudget(self, client, url, budget, repeat_limit=None):
+        repeat_limit = repeat_limit or self.repeat_limit
+        with CaptureQueriesContext(connection) as queries, \
+                QueryTracker(settings.QUERYCHECK_SLOW_MS) as tracker:
+            response = client.get(url)
+        executed = [query['sql'] for query in queries.captured_queries]
+        self.assertLessEqual(
+            len(executed), budget,
+            f'{url}: {len(executed)} запросов при бюджете {budget}:\n'
+            + '\n'.join(executed)
+        )
+        if repeat_limit:
+            self.assertFalse(
+                tracker.repeated(repeat_limit + 1),
+                f'{url}: N+1\n{tracker.describe(repeat_limit + 1)}',
+            )
+        return response
@@ -0,0 +1,107 @@
+"""Миниатюры постов готовятся в фоне, а не при рендере ленты.
+
+DeferredThumbnailBackend подключается через THUMBNAIL_BACKEND: тег
+{% thumbnail %} получает миниатюру, только если она уже есть в
+хранилище sorl, иначе ставит её в очередь и выводит заглушку из
+{% empty %}. Очередь — общий пул фоновых задач core.tasks, внешний
+брокер не нужен.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from core import metrics, tasks
+
+logger = logging.getLogger(__name__)
+
+_pending = set()
+_lock = threading.Lock()
+
+
+class DeferredThumbnailBackend(ThumbnailBackend):
+    """Никогда не уменьшает картинку в потоке запроса."""
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        source = ImageFile(file_)
+        full_options = self._full_options(source, options)
+        name = self._get_thumbnail_filename(
+            source, geometry_string, full_options
+        )
+        cached = default.kvstore.get(ImageFile(name, default.storage))
+        if cached:
+            return cached
+        if source.exists():
+            schedule(source.name, geometry_string, options, name)
+        return None
+
+    def _full_options(self, source, options):
+        # Те же умолчания, что и в ThumbnailBackend.get_thumbnail, чтобы
+        # имя файла миниатюры совпало с тем, что создаст воркер.
+        options = dict(options)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+
+def _generate(source_name, geometry, options, key):
+    try:
+        with metrics.timed_thumbnail('thumbnail'):
+            ThumbnailBackend().get_thumbnail(source_name, geometry, **options)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', source_name)
+    finally:
+        with _lock:
+            _pending.discard(key)
+        cache.delete(f'thumbnail-lock:{key}')
+
+
+def _start(source_name, geometry, options, key):
+    with _lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+    # Блокировка в кэше не даёт другим воркерам готовить ту же картинку.
+    lock_key = f'thumbnail-lock:{key}'
+    if not cache.add(lock_key, 1, settings.POSTS_THUMBNAIL_LOCK_TIMEOUT):
+        with _lock:
+            _pending.discard(key)
+        return
+    tasks.submit(_generate, source_name, geometry, options, key)
+
+
+def schedule(source_name, geometry, options, key):
+    """Ставит миниатюру key в очередь, если её ещё никто не готовит."""
+    if not settings.BACKGROUND_WORKERS:
+        _start(source_name, geometry, options, key)
+        return
+    transaction.on_commit(
+        lambda: _start(source_name, geometry, options, key)
+    )
+
+
+def pregenerate(image):
+    """Готовит все миниатюры из POSTS_THUMBNAIL_PRESETS для картинки."""
+    if not image:
+        return
+    backend = DeferredThumbnailBackend()
+    for geometry, options in settings.POSTS_THUMBNAIL_PRESETS:
+        try:
+            backend.get_thumbnail(image.name, geometry, **options)
+        except Exception:
+            logger.exception('Не удалось поставить в очередь %s', image.name)
@@ -0,0 +1,163 @@
+"""Лента подписок, разложенная по подписчикам при записи.
+
+Посты обычных авторов копируются в TimelineEntry каждого подписчика,
+и страница /follow/ читает один диапазон по индексу (user, -pub_date).
+Посты авторов с огромным числом подписчиков не раскладываются: их
+лента собирается при чтении, как раньше. Ленты уже существующих подписок
+заполняет миграция 0011_fill_timelines той же функцией fill(), что и
+rebuild().
+"""
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+
+def is_fanout_exempt(author_id):
+    """Автору слишком много подписчиков для раскладки при записи."""
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gte=settings.POSTS_FANOUT_FOLLOWER_LIMIT,
+    ).exists()
+
+
+def exempt_authors(user):
+    """Авторы из подписок user, чьи посты собираются при чтении."""
+    return AuthorStats.objects.filter(
+        user__following__user=user,
+        followers_count__gte=settings.POSTS_FANOUT_FOLLOWER_LIMIT,
+    ).values_list('user_id', flat=True)
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_fanout_exempt(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in follower_ids.iterator()
+        ],
+        batch_size=settings.POSTS_TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту нового подписчика последние посты автора."""
+    if is_fanout_exempt(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )[:settings.POSTS_TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ],
+        batch_size=settings.POSTS_TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def restore_fanout(author_id):
+    """Раскладывает последние посты автора всем подписчикам.
+
+    Пока автор был выше порога, его посты не раскладывались, а новым
+    подписчикам не делался backfill; без этого после отписки части
+    подписчиков посты пропали бы из лент остальных.
+    """
+    posts = list(Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )[:settings.POSTS_TIMELINE_BACKFILL])
+    if not posts:
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for user_id in follower_ids.iterator()
+            for pk, pub_date in posts
+        ),
+        batch_size=settings.POSTS_TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def unfollow(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося пользователя."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def follow_feed(user):
+    """Посты ленты подписок user, новые сверху."""
+    exempt = list(exempt_authors(user))
+    if not exempt:
+        return Post.objects.filter(timeline_entries__user=user)
+    entries = TimelineEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(Q(pk__in=entries) | Q(author_id__in=exempt))
+
+
+def fill(user_ids=None, models=None, using=None):
+    """Раскладывает последние посты авторов по лентам их подписчиков.
+
+    models — (Follow, Post, TimelineEntry); миграция передаёт сюда
+    исторические модели. Популярные авторы определяются по самой таблице
+    Follow: в миграции AuthorStats может быть ещё не заполнена. Записи
+    пишутся пачками по POSTS_TIMELINE_BATCH_SIZE.
+    """
+    follow_model, post_model, entry_model = models or (
+        Follow, Post, TimelineEntry
+    )
+    batch_size = settings.POSTS_TIMELINE_BATCH_SIZE
+    exempt = set(
+        follow_model.objects.using(using).values('author_id')
+        .annotate(followers=Count('pk'))
+        .filter(followers__gte=settings.POSTS_FANOUT_FOLLOWER_LIMIT)
+        .values_list('author_id', flat=True)
+    )
+    follows = follow_model.objects.using(using).order_by('author_id')
+    if user_ids is not None:
+        follows = follows.filter(user_id__in=user_ids)
+    # Подписки идут по авторам, поэтому в памяти посты одного автора.
+    current, posts, batch = None, [], []
+    for user_id, author_id in follows.values_list(
+        'user_id', 'author_id'
+    ).iterator():
+        if author_id in exempt:
+            continue
+        if author_id != current:
+            current = author_id
+            posts = list(
+                post_model.objects.using(using).filter(author_id=author_id)
+                .order_by('-pub_date').values_list('pk', 'pub_date')
+                [:settings.POSTS_TIMELINE_BACKFILL]
+            )
+        batch.extend(
+            entry_model(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        )
+        if len(batch) >= batch_size:
+            entry_model.objects.db_manager(using).bulk_create(
+                batch, ignore_conflicts=True
+            )
+            batch = []
+    entry_model.objects.db_manager(using).bulk_create(
+        batch, ignore_conflicts=True
+    )
+
+
+def rebuild(user_ids=None):
+    """Пересобирает ленты заново, например после массового импорта."""
+    entries = TimelineEntry.objects.all()
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+    entries.delete()
+    fill(user_ids)
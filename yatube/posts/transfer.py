@@ -0,0 +1,268 @@
+"""Выгрузка и загрузка групп, постов, комментариев и подписок.
+
+Данные идут потоком в обе стороны. Экспорт читает таблицу iterator() по
+первичному ключу, импорт держит в памяти не больше batch_size записей и
+сохраняет их bulk_create, каждую пачку в своей транзакции. Форматы —
+NDJSON (объект на строку) и CSV с заголовком.
+
+Первичные ключи переносятся как есть: комментарии ссылаются на посты из
+той же выгрузки, а повторная загрузка уже сохранённой пачки ничего не
+дублирует (ignore_conflicts). На этом держится возобновление: после
+сбоя файл дочитывается со смещения последней сохранённой пачки.
+
+bulk_create не шлёт сигналов, поэтому поколения лент сдвигаются после
+каждой пачки, а счётчики, ленты подписок, поисковый индекс, рейтинг
+популярного и кандидаты в подписки пересобираются в конце
+(rebuild_derived).
+"""
+import csv
+import json
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import (
+    feed_cache, recommendations, search, stats, timeline, trending,
+)
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Порядок важен для загрузки: посты ссылаются на группы, комментарии —
+# на посты. Пользователи должны уже быть в базе.
+MODELS = {
+    'groups': (Group, ('id', 'title', 'slug', 'description')),
+    'posts': (Post, (
+        'id', 'author_id', 'group_id', 'text', 'image', 'pub_date', 'updated',
+    )),
+    'comments': (Comment, ('id', 'post_id', 'author_id', 'text', 'created')),
+    'follows': (Follow, ('id', 'user_id', 'author_id')),
+}
+FORMATS = ('ndjson', 'csv')
+
+DERIVED = {
+    'groups': (),
+    'posts': (stats.rebuild, timeline.rebuild, search.rebuild),
+    'comments': (stats.rebuild, trending.rebuild),
+    'follows': (stats.rebuild, timeline.rebuild, recommendations.rebuild),
+}
+
+
+def _feeds(name, objects):
+    """Ленты, которые устаревают после загрузки пачки."""
+    if name == 'posts':
+        return {'index'} | {
+            f'profile:{post.author_id}' for post in objects
+        } | {
+            f'group:{post.group_id}' for post in objects if post.group_id
+        }
+    if name == 'comments':
+        return {f'post:{comment.post_id}' for comment in objects}
+    if name == 'follows':
+        return {f'follow:{follow.user_id}' for follow in objects}
+    return set()
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_rows(name, batch_size=1000):
+    """Записи таблицы словарями по возрастанию первичного ключа."""
+    model, fields = MODELS[name]
+    rows = model.objects.order_by('pk').values_list(*fields).iterator(
+        chunk_size=batch_size
+    )
+    for row in rows:
+        yield dict(zip(fields, map(_encode, row)))
+
+
+def write_rows(stream, name, rows, fmt):
+    """Пишет записи в текстовый поток; возвращает их число."""
+    count = 0
+    if fmt == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(MODELS[name][1])
+        for row in rows:
+            writer.writerow(
+                '' if value is None else value for value in row.values()
+            )
+            count += 1
+        return count
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+class Lines:
+    """Строки бинарного файла текстом и смещение после прочитанного.
+
+    csv.reader берёт строки по одной, пока не соберёт запись, поэтому
+    смещение после каждой записи точное — даже если в тексте поста
+    есть переводы строк.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.offset = raw.tell() if raw.seekable() else 0
+
+    def __iter__(self):
+        for line in iter(self.raw.readline, b''):
+            self.offset += len(line)
+            yield line.decode('utf-8')
+
+    def seek(self, offset):
+        self.raw.seek(offset)
+        self.offset = offset
+
+
+def read_rows(raw, name, fmt, offset=0):
+    """Пары (запись, смещение после неё) из бинарного потока.
+
+    offset — смещение, с которого продолжить; заголовок CSV всё равно
+    читается с начала файла.
+    """
+    lines = Lines(raw)
+    fields = set(MODELS[name][1])
+    if fmt == 'csv':
+        reader = csv.reader(lines)
+        header = next(reader, None)
+        if header is None:
+            return
+        unknown = set(header) - fields
+        if unknown:
+            raise ValueError(
+                f'Неизвестные колонки {name}: {", ".join(sorted(unknown))}.'
+            )
+        if offset > lines.offset:
+            lines.seek(offset)
+        for values in reader:
+            yield dict(zip(header, values)), lines.offset
+        return
+    if offset:
+        lines.seek(offset)
+    for line in lines:
+        if line.strip():
+            row = json.loads(line)
+            unknown = set(row) - fields
+            if unknown:
+                raise ValueError(
+                    f'Неизвестные поля {name}: '
+                    f'{", ".join(sorted(unknown))}.'
+                )
+            yield row, lines.offset
+
+
+def _build(model, row):
+    values = {}
+    for attname, value in row.items():
+        field = model._meta.get_field(attname)
+        if value == '' and field.null:
+            value = None
+        values[attname] = field.to_python(value)
+    for field in model._meta.concrete_fields:
+        is_date = getattr(field, 'auto_now', False) or getattr(
+            field, 'auto_now_add', False
+        )
+        if is_date and values.get(field.attname) is None:
+            values[field.attname] = timezone.now()
+    return model(**values)
+
+
+@contextmanager
+def _keep_dates(model):
+    """Не даёт bulk_create заменить даты из выгрузки на «сейчас»."""
+    saved = [
+        (field, field.auto_now, field.auto_now_add)
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', None) is not None
+    ]
+    for field, _, _ in saved:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _without_dangling(model, objects):
+    """Отбрасывает записи, ссылающиеся на отсутствующие строки."""
+    for field in model._meta.concrete_fields:
+        if not field.is_relation:
+            continue
+        wanted = {
+            getattr(obj, field.attname) for obj in objects
+        } - {None}
+        allowed = set(field.related_model.objects.filter(
+            pk__in=wanted
+        ).values_list('pk', flat=True)) | {None}
+        objects = [
+            obj for obj in objects
+            if getattr(obj, field.attname) in allowed
+        ]
+    return objects
+
+
+def _save(name, objects):
+    model = MODELS[name][0]
+    with transaction.atomic():
+        valid = _without_dangling(model, objects)
+        with _keep_dates(model):
+            model.objects.bulk_create(valid, ignore_conflicts=True)
+    feed_cache.bump(*_feeds(name, valid))
+    return len(objects) - len(valid)
+
+
+def import_rows(name, rows, batch_size=1000, on_batch=None):
+    """Загружает пары (запись, смещение) пачками по batch_size.
+
+    После каждой сохранённой пачки вызывается on_batch(обработано,
+    пропущено, смещение): смещение можно запомнить и продолжить с него.
+    Записи со ссылками на несуществующие строки пропускаются.
+    Возвращает (обработано, пропущено).
+    """
+    model = MODELS[name][0]
+    processed = skipped = 0
+    batch, offset = [], None
+    for row, offset in rows:
+        batch.append(_build(model, row))
+        if len(batch) >= batch_size:
+            skipped += _save(name, batch)
+            processed += len(batch)
+            batch = []
+            if on_batch is not None:
+                on_batch(processed, skipped, offset)
+    if batch:
+        skipped += _save(name, batch)
+        processed += len(batch)
+        if on_batch is not None:
+            on_batch(processed, skipped, offset)
+    _reset_sequence(model)
+    return processed, skipped
+
+
+def _reset_sequence(model):
+    # Ключи пришли из выгрузки: в PostgreSQL последовательность нужно
+    # подвинуть за максимальный id, в SQLite запросов нет.
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def rebuild_derived(names):
+    """Пересобирает данные, которые обычно ведут сигналы."""
+    done = set()
+    for name in names:
+        for rebuild in DERIVED[name]:
+            if rebuild not in done:
+                rebuild()
+                done.add(rebuild)
@@ -0,0 +1,149 @@
+"""Популярные посты: рейтинг по активности, затухающей со временем.
+
+Каждый комментарий добавляет посту POSTS_TRENDING_COMMENT_WEIGHT, каждая
+новая подписка на автора — POSTS_TRENDING_FOLLOW_WEIGHT его последним
+постам. Вклад события убывает вдвое за POSTS_TRENDING_HALF_LIFE секунд.
+
+В PostScore.score хранится логарифм суммы w * exp((t - EPOCH) / tau) по
+событиям поста. Затухание у всех постов одинаковое, поэтому порядок по
+score совпадает с порядком по текущему рейтингу: событие меняет одну
+строку, а старые строки пересчитывать не нужно. Сам рейтинг на момент
+now — exp(score - (now - EPOCH) / tau). Событие прибавляется одним
+UPDATE с выражением над score, поэтому одновременные комментарии не
+теряют друг друга. Ошибка базы при этом только пишется в лог и не мешает
+сохранить комментарий или подписку.
+
+compact() удаляет строки, чей рейтинг упал ниже POSTS_TRENDING_MIN_SCORE:
+такие посты в популярное уже не попадут (команда compact_trending,
+запускается по расписанию). rebuild() собирает таблицу заново по
+комментариям; подписки в ней не учитываются — у Follow нет даты.
+"""
+import logging
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+
+from .models import Comment, Post, PostScore
+
+EPOCH = datetime(2021, 1, 1, tzinfo=dt_timezone.utc)
+BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+def _tau():
+    return settings.POSTS_TRENDING_HALF_LIFE / math.log(2)
+
+
+def _exponent(moment):
+    return (moment - EPOCH).total_seconds() / _tau()
+
+
+def _log_add(first, second):
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def _log_added(increment):
+    """_log_add(score, increment) выражением SQL над столбцом."""
+    return Greatest(F('score'), Value(increment)) + Ln(
+        1 + Exp(-Abs(F('score') - increment))
+    )
+
+
+def current(score, now=None):
+    """Рейтинг поста на момент now по сохранённому score."""
+    return math.exp(score - _exponent(now or timezone.now()))
+
+
+def add_activity(post_ids, weight, moment=None):
+    """Добавляет постам событие веса weight, случившееся в moment."""
+    increment = math.log(weight) + _exponent(moment or timezone.now())
+    for post_id in post_ids:
+        scores = PostScore.objects.filter(post_id=post_id)
+        if scores.update(score=_log_added(increment)):
+            continue
+        try:
+            with transaction.atomic():
+                PostScore.objects.create(post_id=post_id, score=increment)
+        except IntegrityError:
+            # Строку успели создать параллельно.
+            scores.update(score=_log_added(increment))
+
+
+def _record(post_ids, weight, moment=None):
+    try:
+        with transaction.atomic():
+            add_activity(post_ids, weight, moment)
+    except DatabaseError:
+        logger.exception('Не удалось обновить рейтинг постов %s', post_ids)
+
+
+def on_comment(comment):
+    _record(
+        [comment.post_id], settings.POSTS_TRENDING_COMMENT_WEIGHT,
+        comment.created,
+    )
+
+
+def on_follow(author_id):
+    post_ids = list(Post.objects.filter(author_id=author_id).values_list(
+        'pk', flat=True
+    )[:settings.POSTS_TRENDING_FOLLOW_POSTS])
+    if post_ids:
+        _record(post_ids, settings.POSTS_TRENDING_FOLLOW_WEIGHT)
+
+
+def top_ids(limit=None):
+    """id самых популярных постов, по убыванию рейтинга."""
+    limit = limit or settings.POSTS_TRENDING_SIZE
+    return list(PostScore.objects.order_by('-score').values_list(
+        'post_id', flat=True
+    )[:limit])
+
+
+def _threshold(now):
+    return math.log(settings.POSTS_TRENDING_MIN_SCORE) + _exponent(now)
+
+
+def compact(now=None):
+    """Удаляет строки с рейтингом ниже порога. Возвращает их число."""
+    deleted, _ = PostScore.objects.filter(
+        score__lt=_threshold(now or timezone.now())
+    ).delete()
+    return deleted
+
+
+def rebuild(now=None):
+    """Собирает PostScore заново по комментариям, которые ещё не
+    затухли ниже порога. Возвращает число постов в рейтинге."""
+    now = now or timezone.now()
+    weight = settings.POSTS_TRENDING_COMMENT_WEIGHT
+    # Комментарий старше horizon весит меньше POSTS_TRENDING_MIN_SCORE.
+    horizon = timedelta(
+        seconds=_tau() * math.log(weight / settings.POSTS_TRENDING_MIN_SCORE)
+    )
+    scores = {}
+    comments = Comment.objects.filter(
+        created__gte=now - horizon
+    ).order_by().values_list('post_id', 'created')
+    for post_id, created in comments.iterator():
+        increment = math.log(weight) + _exponent(created)
+        previous = scores.get(post_id)
+        scores[post_id] = (
+            increment if previous is None else _log_add(previous, increment)
+        )
+    threshold = _threshold(now)
+    rows = [
+        PostScore(post_id=post_id, score=score)
+        for post_id, score in scores.items() if score >= threshold
+    ]
+    with transaction.atomic():
+        PostScore.objects.all().delete()
+        PostScore.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
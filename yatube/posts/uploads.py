@@ -0,0 +1,113 @@
+"""Приём и подготовка картинок постов.
+
+SizeLimitUploadHandler стоит первым в FILE_UPLOAD_HANDLERS и бросает
+файл, как только тот превысил POSTS_IMAGE_MAX_UPLOAD_SIZE, не дожидаясь
+конца загрузки. process_image убирает EXIF и XMP и уменьшает огромные
+оригиналы. JPEG при этом декодируется сразу в уменьшенном масштабе, а
+PNG и WebP — только целиком, поэтому их разрешение форма ограничивает
+строже: POSTS_IMAGE_MAX_DECODED_PIXELS вместо POSTS_IMAGE_MAX_PIXELS.
+"""
+import io
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Что можно пересохранить; GIF не трогаем, чтобы не потерять анимацию.
+REENCODED_FORMATS = ('JPEG', 'PNG', 'WEBP')
+# Форматы, которые Pillow умеет декодировать сразу уменьшенными (draft).
+DRAFT_FORMATS = ('JPEG',)
+# Ключи Image.info, в которых приходят EXIF и XMP (там бывает GPS).
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp')
+
+
+class SizeLimitUploadHandler(FileUploadHandler):
+    """Отбрасывает слишком большие файлы по ходу загрузки.
+
+    Имена отброшенных полей складываются в request.rejected_uploads,
+    чтобы форма могла показать ошибку.
+    """
+
+    def new_file(self, field_name, file_name, content_type, content_length,
+                 charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type,
+                         content_length, charset, content_type_extra)
+        self.received = 0
+        if content_length and content_length > self.limit:
+            self._reject()
+
+    @property
+    def limit(self):
+        return settings.POSTS_IMAGE_MAX_UPLOAD_SIZE
+
+    def _reject(self):
+        if not hasattr(self.request, 'rejected_uploads'):
+            self.request.rejected_uploads = set()
+        self.request.rejected_uploads.add(self.field_name)
+        raise SkipFile()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.limit:
+            self._reject()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def needs_processing(image):
+    if image.format not in REENCODED_FORMATS:
+        return False
+    width, height = image.size
+    max_side = settings.POSTS_IMAGE_MAX_DIMENSION
+    # Смотрим только на прочитанное при разборе заголовка: getexif() у
+    # PNG декодировал бы картинку целиком.
+    has_metadata = any(image.info.get(key) for key in METADATA_KEYS)
+    return has_metadata or width > max_side or height > max_side
+
+
+def process_image(uploaded, image):
+    """Возвращает файл без EXIF и не больше POSTS_IMAGE_MAX_DIMENSION.
+
+    image — уже открытый (но не декодированный) Image из валидации.
+    Если делать ничего не нужно, возвращается исходный файл.
+    """
+    started = time.perf_counter()
+    if not needs_processing(image):
+        result = uploaded
+    else:
+        max_side = settings.POSTS_IMAGE_MAX_DIMENSION
+        fmt = image.format
+        uploaded.seek(0)
+        image = Image.open(uploaded)
+        # Для JPEG draft декодирует сразу в уменьшенном масштабе (1/2, 1/4,
+        # 1/8), поэтому в памяти не оказывается полноразмерный оригинал.
+        image.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        buffer = io.BytesIO()
+        options = {'quality': 90} if fmt in ('JPEG', 'WEBP') else {}
+        # exif_transpose и thumbnail переносят info в новую картинку, а
+        # PNG пишет info['exif'] обратно. Оставляем только цветовой профиль.
+        if image.info.get('icc_profile'):
+            options['icc_profile'] = image.info['icc_profile']
+        image.info = {}
+        image.save(buffer, fmt, exif=b'', **options)
+        result = ContentFile(
+            buffer.getvalue(), name=os.path.basename(uploaded.name)
+        )
+    elapsed = (time.perf_counter() - started) * 1000
+    logger.info(
+        'Картинка %s (%s байт) обработана за %.1f мс',
+        uploaded.name, uploaded.size, elapsed,
+    )
+    return result, elapsed
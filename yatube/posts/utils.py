@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+
+from core import routers, swr
+
+from .paginator import KeysetPage, KeysetPaginator
+
+PAGE_PARAMS = ('page', 'after', 'before')
+
+
+def get_page(request, post_list, per_page, count=None):
+    """Страница ленты: по номеру или по курсору ?after=/?before=.
+
+    Известное заранее число записей count избавляет Paginator от COUNT(*).
+    count может быть функцией: её вызовут, только если число понадобится.
+    """
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if settings.POSTS_KEYSET_PAGINATION or after or before:
+        paginator = KeysetPaginator(post_list, per_page)
+        return paginator.get_page(after=after, before=before)
+    paginator = Paginator(post_list, per_page)
+    if count is not None:
+        paginator.count = count() if callable(count) else count
+    return paginator.get_page(request.GET.get('page'))
+
+
+def comments_paginator(post):
+    return KeysetPaginator(
+        post.comments.select_related('author'),
+        settings.POSTS_COMMENTS_PER_PAGE, field='created',
+    )
+
+
+def get_comments_page(post, after=None):
+    """Страница комментариев поста, новые первыми, по курсору after."""
+    return comments_paginator(post).get_page(after=after)
+
+
+def _page_state(page_obj):
+    ids = [post.pk for post in page_obj]
+    if isinstance(page_obj, KeysetPage):
+        return ('keyset', ids, page_obj.has_next(), page_obj.has_previous())
+    return ('number', ids, page_obj.number, page_obj.paginator.count)
+
+
+def _restore_page(state, post_list, per_page):
+    kind, ids, *rest = state
+    posts = post_list.in_bulk(ids)
+    object_list = [posts[pk] for pk in ids if pk in posts]
+    if kind == 'keyset':
+        has_next, has_previous = rest
+        paginator = KeysetPaginator(post_list, per_page)
+        return KeysetPage(object_list, paginator, has_next, has_previous)
+    number, count = rest
+    paginator = Paginator(post_list, per_page)
+    paginator.count = count
+    page_obj = paginator.get_page(number)
+    page_obj.object_list = object_list
+    return page_obj
+
+
+def get_cached_page(request, feed_name, version, post_list, per_page,
+                    count=None):
+    """get_page, у которого список id постов страницы берётся из кэша.
+
+    Кэшируется только то, что одинаково для всех посетителей: какие посты
+    попали на страницу и сколько их всего. Сами посты дочитываются по
+    первичному ключу, а их карточки кэшируются в шаблоне. version —
+    поколение ленты из feed_cache: при его смене страницу пересобирает
+    один запрос, остальные пока получают прежнюю (core.swr).
+    """
+    params = ':'.join(request.GET.get(name, '') for name in PAGE_PARAMS)
+    fresh = settings.POSTS_FEED_CACHE_TIMEOUT
+    if routers.replica_for_read() is not None:
+        # Реплика могла ещё не получить запись, из-за которой сменилось
+        # поколение ленты: такую страницу держим недолго.
+        fresh = settings.REPLICA_FEED_CACHE_TIMEOUT
+    built = []
+
+    def build():
+        built.append(get_page(request, post_list, per_page, count=count))
+        return _page_state(built[0])
+
+    state = swr.get_or_compute(
+        f'feed:{feed_name}:{params}', build,
+        fresh, settings.POSTS_FEED_CACHE_STALE, version=version,
+        # Закреплённому клиенту кэш не отдаём: страницу в нём могли
+        # собрать по отставшей реплике, без его же записи.
+        force=routers.is_pinned(),
+        name='feed',
+    )
+    if built:
+        # Страницу собрал этот же запрос: посты уже прочитаны.
+        return built[0]
+    return _restore_page(state, post_list, per_page)
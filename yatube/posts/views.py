@@ -1,34 +1,69 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
+from django.core.paginator import Paginator
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+
+from core import routers, swr
+from core.routers import replica_reads
 
+from . import (
+    counts, feed_cache, recommendations, search, stats, timeline, trending,
+)
 from .models import Post, Group, User, Follow
 from .forms import PostForm, CommentForm
+from .paginator import KeysetPage
+from .utils import comments_paginator, get_cached_page, get_comments_page
 
 
 LIM_POST: int = 10
 
 
-@cache_page(20, key_prefix='index_page')
+@replica_reads
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, LIM_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.for_feed()
+    page_obj = get_cached_page(
+        request, 'index', feed_cache.generation('index'), post_list,
+        LIM_POST,
+        count=lambda: counts.feed_count('index', post_list),
+    )
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@replica_reads
+def popular(request):
+    """Популярные посты: список id пересчитывается раз в минуту."""
+    ids = swr.get_or_compute(
+        'trending:ids', trending.top_ids,
+        settings.POSTS_TRENDING_CACHE_TIMEOUT,
+        settings.POSTS_FEED_CACHE_STALE, name='trending',
+    )
+    page_obj = Paginator(ids, LIM_POST).get_page(request.GET.get('page'))
+    posts = Post.objects.for_feed().in_bulk(page_obj.object_list)
+    page_obj.object_list = [
+        posts[pk] for pk in page_obj.object_list if pk in posts
+    ]
+    context = {
+        'page_obj': page_obj,
+        'popular': True,
+    }
+    return render(request, 'posts/popular.html', context)
+
+
+@replica_reads
 def group_posts(request, slug):
     """Function sorts the data and sends it to the template."""
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, LIM_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = group.posts.for_feed()
+    feed_name = f'group:{group.pk}'
+    page_obj = get_cached_page(
+        request, feed_name, feed_cache.generation(feed_name), post_list,
+        LIM_POST, count=lambda: counts.feed_count(feed_name, post_list),
+    )
     title = group.title
     description = group.description
     context = {
@@ -40,12 +75,18 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    paginator = Paginator(post_list, LIM_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    post_list = author.posts.for_feed()
+    posts_count = stats.for_user(author).posts_count
+    feed_name = f'profile:{author.pk}'
+    page_obj = get_cached_page(
+        request, feed_name, feed_cache.generation(feed_name), post_list,
+        LIM_POST, count=posts_count
+    )
     if request.user.is_authenticated:
         following = Follow.objects.filter(
             user=request.user, author=author
@@ -55,35 +96,104 @@ def profile(request, username):
     context = {'post_list': post_list,
                'page_obj': page_obj,
                'author': author,
+               'posts_count': posts_count,
                'following': following,
                }
     return render(request, 'posts/profile.html', context)
 
 
+def _post_with_count(post_id):
+    """Пост и счётчик постов его автора."""
+    post = get_object_or_404(
+        Post.objects.for_feed().select_related('author__stats'), id=post_id
+    )
+    return post, stats.for_user(post.author).posts_count
+
+
+def _post_detail_payload(post_id):
+    """Пост, счётчик постов автора и первая страница комментариев."""
+    post, posts_count = _post_with_count(post_id)
+    comments = get_comments_page(post)
+    return {
+        'post': post,
+        'posts_count': posts_count,
+        # Страница без paginator: его queryset при pickle прочитал бы
+        # все комментарии поста.
+        'comments': (list(comments), comments.has_next()),
+    }
+
+
+@replica_reads
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    posts_count = post.author.posts.count()
-    author = post.author
-    text = post.text
-    title = text[:30]
+    comments_after = request.GET.get('comments_after')
+    if comments_after:
+        post, posts_count = _post_with_count(post_id)
+        payload = {'post': post, 'posts_count': posts_count}
+        comments = get_comments_page(post, comments_after)
+    else:
+        payload = swr.get_or_compute(
+            f'post_detail:{post_id}',
+            lambda: _post_detail_payload(post_id),
+            settings.POSTS_DETAIL_CACHE_FRESH,
+            settings.POSTS_DETAIL_CACHE_STALE,
+            version=feed_cache.generation(f'post:{post_id}'),
+            force=routers.is_pinned(),
+            name='post_detail',
+        )
+        comment_list, has_next = payload['comments']
+        comments = KeysetPage(
+            comment_list, comments_paginator(payload['post']), has_next,
+            False,
+        )
+    post = payload['post']
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
     context = {
         'post_id': post_id,
-        'title': title,
-        'posts_count': posts_count,
+        'title': post.text[:30],
+        'posts_count': payload['posts_count'],
         'post': post,
-        'author': author,
+        'author': post.author,
         'comments': comments,
         'form': form
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@replica_reads
+def post_comments(request, post_id):
+    """Следующая страница комментариев для кнопки «Показать ещё»."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = get_comments_page(post, request.GET.get('after'))
+    html = render_to_string(
+        'posts/includes/comment_list.html', {'comments': comments}, request
+    )
+    return JsonResponse({'html': html, 'next': comments.next_cursor})
+
+
+def post_search(request):
+    """Поиск по тексту постов, лучшие совпадения сверху."""
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = search.search_posts(
+            query, LIM_POST,
+            after=request.GET.get('after'), before=request.GET.get('before'),
+        )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     """Страница создания нового поста"""
-    form = PostForm(request.POST or None, files=request.FILES or None)
+    form = PostForm(
+        request.POST or None,
+        files=request.FILES or None,
+        rejected_uploads=getattr(request, 'rejected_uploads', ()),
+    )
     if form.is_valid():
         new_post = form.save(commit=False)
         new_post.author = request.user
@@ -101,7 +211,8 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=post
+        instance=post,
+        rejected_uploads=getattr(request, 'rejected_uploads', ()),
     )
     if form.is_valid():
         form.save()
@@ -127,17 +238,29 @@ def add_comment(request, post_id):
 
 
 @login_required
+@replica_reads
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, LIM_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = timeline.follow_feed(request.user).for_feed()
+    feed_name = f'follow:{request.user.pk}'
+    page_obj = get_cached_page(
+        request, feed_name, feed_cache.follow_feed_key(request.user.pk),
+        post_list, LIM_POST,
+        count=lambda: counts.feed_count(feed_name, post_list),
+    )
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/follow.html', context)
 
 
+@login_required
+def follow_suggestions(request):
+    context = {
+        'candidates': recommendations.for_user(request.user),
+    }
+    return render(request, 'posts/follow_suggestions.html', context)
+
+
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
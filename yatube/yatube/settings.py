@@ -38,6 +38,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.QueryCheckMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,7 +54,8 @@ ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.templates.DjangoTemplates',
+        'NAME': 'django',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -72,13 +76,60 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
+# Профиль SQLite выбирается переменной YATUBE_SQLITE_PROFILE. production
+# включает WAL (читатели не ждут писателя), synchronous=NORMAL, mmap,
+# ожидание блокировки вместо ошибки, BEGIN IMMEDIATE для записи и
+# постоянные соединения. Сравнить профили: manage.py benchmark_sqlite.
+SQLITE_PROFILES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
+    },
+    'production': {
+        'ENGINE': 'core.sqlite',
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'timeout': 5,
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'mmap_size': 256 * 2 ** 20,
+                'cache_size': -32000,
+                'temp_store': 'MEMORY',
+            },
+        },
+    },
+}
+SQLITE_PROFILE = os.getenv('YATUBE_SQLITE_PROFILE', 'default')
+
+DATABASES = {
+    'default': {
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        **SQLITE_PROFILES[SQLITE_PROFILE],
     }
 }
 
+# Реплики для чтения. Локально роль реплики играет второй файл SQLite
+# (YATUBE_REPLICA=1), его наполняет команда sync_replica; в тестах он
+# зеркалит default.
+DATABASE_REPLICAS = []
+if os.getenv('YATUBE_REPLICA'):
+    DATABASES['replica'] = {
+        'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+        **SQLITE_PROFILES[SQLITE_PROFILE],
+    }
+    DATABASE_REPLICAS = ['replica']
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# После записи клиент столько секунд читает из default (cookie), чтобы
+# видеть свои изменения, пока реплика догоняет.
+REPLICA_PIN_SECONDS = 5
+REPLICA_PIN_COOKIE = 'pin_primary'
+# Страница ленты, собранная по реплике, кэшируется не дольше этого.
+REPLICA_FEED_CACHE_TIMEOUT = 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -135,8 +186,167 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
+# Общий для воркеров кэш выбирается переменной YATUBE_CACHE:
+# locmem (по умолчанию, у каждого процесса свой), file, sqlite, redis
+# (нужен django-redis) или memcached (нужен pylibmc).
+SHARED_CACHES = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyLibMCCache',
+        'LOCATION': os.getenv('MEMCACHED_LOCATION', '127.0.0.1:11211'),
+    },
 }
+
+CACHE_KIND = os.getenv('YATUBE_CACHE', 'locmem')
+
+# YATUBE_CACHE_LOCAL_TIER=1 ставит перед общим кэшем LRU процесса.
+if os.getenv('YATUBE_CACHE_LOCAL_TIER'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.TwoTierCache',
+            'OPTIONS': {
+                'SHARED': 'shared',
+                'LOCAL_MAX_ENTRIES': 1000,
+                'LOCAL_TIMEOUT': 5,
+            },
+        },
+        'shared': SHARED_CACHES[CACHE_KIND],
+    }
+else:
+    CACHES = {
+        'default': SHARED_CACHES[CACHE_KIND],
+    }
+
+# Лента постранично по курсору (pub_date, id) вместо номера страницы.
+# Ссылки с ?after=/?before= обрабатываются курсором в любом случае.
+POSTS_KEYSET_PAGINATION = False
+
+# Комментарии на странице поста: столько выводится сразу, остальные
+# догружаются по курсору из posts:post_comments.
+POSTS_COMMENTS_PER_PAGE = 20
+
+# Размер страницы лент в JSON-API (/api/v1/).
+POSTS_API_PAGE_SIZE = 20
+
+# Число постов для номеров страниц: ленты до POSTS_EXACT_COUNT_LIMIT
+# считаются точно, большие — по кэшу, который обновляется в фоне раз в
+# POSTS_COUNT_REFRESH секунд, или по статистике базы. None — всегда
+# точный COUNT(*).
+POSTS_EXACT_COUNT_LIMIT = 10000
+POSTS_COUNT_REFRESH = 300
+
+# Страница поста кэшируется целиком: POSTS_DETAIL_CACHE_FRESH секунд
+# отдаётся как свежая, ещё POSTS_DETAIL_CACHE_STALE — как устаревшая,
+# пока один воркер её пересчитывает (core.swr).
+POSTS_DETAIL_CACHE_FRESH = 30
+POSTS_DETAIL_CACHE_STALE = 60 * 10
+
+# Лента подписок: посты раскладываются подписчикам при публикации,
+# кроме авторов, у которых подписчиков не меньше лимита.
+POSTS_FANOUT_FOLLOWER_LIMIT = 5000
+POSTS_TIMELINE_BACKFILL = 1000
+POSTS_TIMELINE_BATCH_SIZE = 500
+
+# Сколько секунд хранится список постов страницы ленты. Устаревшие
+# страницы отсекаются поколениями из posts.feed_cache, а не TTL.
+POSTS_FEED_CACHE_TIMEOUT = 60 * 60 * 4
+# После смены поколения или TTL страница ещё столько секунд отдаётся
+# прежней, пока её пересобирает один запрос.
+POSTS_FEED_CACHE_STALE = 60
+
+# Пул фоновых задач core.tasks: миниатюры, версии картинок, пересчёт
+# счётчиков лент, раскладка ленты подписок, кандидаты в подписки.
+# 0 воркеров — выполнять сразу в потоке, поставившем задачу.
+BACKGROUND_WORKERS = 2
+
+# Миниатюры готовятся в фоне после сохранения поста; шаблоны их только
+# читают.
+THUMBNAIL_BACKEND = 'posts.thumbnails.DeferredThumbnailBackend'
+POSTS_THUMBNAIL_LOCK_TIMEOUT = 60
+POSTS_THUMBNAIL_PRESETS = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+
+# Копии картинок поста для srcset: ширины, пропорции карточки, форматы
+# (AVIF и WebP пропускаются, если Pillow не умеет их кодировать).
+POSTS_RENDITION_WIDTHS = (320, 640, 960)
+POSTS_RENDITION_RATIO = (960, 339)
+POSTS_RENDITION_FORMATS = ('AVIF', 'WEBP', 'JPEG')
+POSTS_RENDITION_QUALITY = 80
+POSTS_RENDITION_SIZES = '(max-width: 960px) 100vw, 960px'
+
+# Загрузка картинок: файл больше лимита отбрасывается ещё во время
+# приёма, картинка проверяется по заголовку, EXIF вырезается, а
+# стороны больше POSTS_IMAGE_MAX_DIMENSION уменьшаются.
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.SizeLimitUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+POSTS_IMAGE_MAX_UPLOAD_SIZE = 10 * 2 ** 20
+POSTS_IMAGE_MAX_PIXELS = 40_000_000
+# PNG и WebP нельзя декодировать уменьшенными: 16 Мп в RGBA — 64 МБ.
+POSTS_IMAGE_MAX_DECODED_PIXELS = 16_000_000
+POSTS_IMAGE_MAX_DIMENSION = 2560
+POSTS_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+# Поиск по постам: класс бэкенда из posts.search. None — выбрать по базе
+# (FTS5 для SQLite, tsvector для PostgreSQL).
+POSTS_SEARCH_BACKEND = None
+
+# Популярное (posts.trending): вклад комментария и подписки на автора
+# убывает вдвое за POSTS_TRENDING_HALF_LIFE секунд. Подписка добавляет
+# рейтинг POSTS_TRENDING_FOLLOW_POSTS последним постам автора. Строки
+# с рейтингом ниже POSTS_TRENDING_MIN_SCORE удаляет compact_trending.
+POSTS_TRENDING_HALF_LIFE = 60 * 60 * 6
+POSTS_TRENDING_COMMENT_WEIGHT = 1.0
+POSTS_TRENDING_FOLLOW_WEIGHT = 0.5
+POSTS_TRENDING_FOLLOW_POSTS = 3
+POSTS_TRENDING_MIN_SCORE = 0.05
+# Сколько постов в популярном и как часто пересчитывается их список.
+POSTS_TRENDING_SIZE = 100
+POSTS_TRENDING_CACHE_TIMEOUT = 60
+
+# Кого почитать (posts.recommendations): сколько кандидатов хранить,
+# веса друзей друзей и похожих читателей. После подписки пересчитываются
+# подписчик и до POSTS_RECOMMENDATIONS_REFRESH_LIMIT его подписчиков;
+# авторы с большим числом подписчиков, чем
+# POSTS_RECOMMENDATIONS_MAX_FOLLOWERS, учитываются только при
+# rebuild_recommendations.
+POSTS_RECOMMENDATIONS_SIZE = 20
+POSTS_RECOMMENDATIONS_FOF_WEIGHT = 1.0
+POSTS_RECOMMENDATIONS_COFOLLOW_WEIGHT = 1.0
+POSTS_RECOMMENDATIONS_REFRESH_LIMIT = 100
+POSTS_RECOMMENDATIONS_MAX_FOLLOWERS = 1000
+
+# core.swr: сколько живёт блокировка пересчёта и сколько ждать чужого
+# пересчёта, если устаревшей копии нет.
+SWR_LOCK_TIMEOUT = 10
+SWR_WAIT_TIMEOUT = 2
+# Вероятность досрочного пересчёта свежей записи (XFetch); 0 — отключить.
+SWR_EARLY_BETA = 1.0
+
+# Замеры запросов: заголовок Server-Timing и /metrics/ для Prometheus.
+SERVER_TIMING_HEADER = DEBUG
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Поиск N+1: YATUBE_QUERYCHECK=log пишет повторяющиеся и медленные
+# запросы в лог, =raise роняет запрос (для прогона тестов в CI).
+QUERYCHECK_MODE = os.getenv('YATUBE_QUERYCHECK', '')
+QUERYCHECK_REPEAT_THRESHOLD = 5
+QUERYCHECK_SLOW_MS = 100